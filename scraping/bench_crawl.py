@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Crawl throughput benchmark against a local replay server
+--------------------------------------------------------
+Starts a local HTTP stand-in for salzburg.info that serves robots.txt, a
+synthetic sitemap index (plain and .xml.gz children) and attraction pages whose
+JSON-LD is built from the records in sc_row.json (or recorded HTML fixtures),
+then runs scrape_sc.py end to end against it for every combination of page
+count and concurrency. Each run keeps exactly that many requests in flight
+(--max-concurrency 0, no AIMD) and skips the page archive and page dedup,
+so only fetching and extraction are measured unless --archive/--page-dedup
+turn those stages back on.
+
+Reported per run: pages/sec, p50/p99 fetch latency as the crawler sees it
+(its fetch_seconds histogram, read from a --stats-file), p50/p99 server
+service time (request received -> response written, mostly the injected
+latency), the most requests the crawler actually had in flight, error
+responses injected and the crawler's peak RSS (including its extractor
+processes).
+
+USAGE
+  python bench_crawl.py --pages 200,2000 --concurrency 1,8,32 \
+      --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+
+Options
+  --pages        Page counts to benchmark (comma-separated) [default 200,1000]
+  --concurrency  Crawler --concurrency values (comma-separated) [default 1,8,32]
+  --latency-ms   Mean added latency per page response [default 30]
+  --jitter-ms    Uniform +/- jitter on the latency [default 10]
+  --error-rate   Fraction of page requests answered with 503/429 [default 0]
+  --page-kb      Pad synthetic pages to roughly this size [default 60]
+  --fixtures     Directory of recorded *.html pages to serve instead
+  --workers      Passed to scrape_sc.py --workers (default: crawler default)
+  --adaptive     Let the crawler adapt concurrency (AIMD) up to 4 x the
+                 --concurrency value instead of keeping it fixed
+  --archive      Keep the crawler's page archive on
+  --page-dedup   Keep the crawler's page dedup on
+  --extra        Extra arguments for scrape_sc.py (quoted string)
+  --json         Also write the results to this JSON file
+"""
+
+import argparse
+import gzip
+import html as htmllib
+import json
+import os
+import pathlib
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = pathlib.Path(__file__).resolve().parent
+SITEMAP_CHUNK = 500  # URLs per child sitemap
+
+
+def load_seed_records() -> list[dict]:
+    with open(HERE / "sc_row.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def jsonld_for(rec: dict, url: str) -> dict:
+    """A schema.org node shaped like what the crawler extracts into sc_row.json."""
+    node = {
+        "@context": "https://schema.org",
+        "@type": "TouristAttraction",
+        "name": rec.get("name"),
+        "description": rec.get("summary"),
+        "url": url,
+        "image": rec.get("images") or [],
+    }
+    addr = rec.get("address") or {}
+    if addr:
+        node["address"] = {
+            "@type": "PostalAddress",
+            "streetAddress": addr.get("street"),
+            "postalCode": addr.get("postal_code"),
+            "addressLocality": addr.get("locality"),
+            "addressRegion": addr.get("region"),
+        }
+    geo = rec.get("geo") or {}
+    if geo:
+        node["geo"] = {
+            "@type": "GeoCoordinates",
+            "latitude": geo.get("lat"),
+            "longitude": geo.get("lon"),
+        }
+    return node
+
+
+class ReplaySite:
+    """Synthetic site content plus per-run request statistics."""
+
+    def __init__(self, pages: int, page_kb: int, fixtures: list[bytes]):
+        self.pages = pages
+        self.page_kb = page_kb
+        self.fixtures = fixtures
+        self.seed = load_seed_records()
+        self.nav = self._nav_padding(page_kb)
+        self.base = ""
+        self.latency = 0.0
+        self.jitter = 0.0
+        self.error_rate = 0.0
+        self.reset()
+
+    def reset(self) -> None:
+        self._lock = threading.Lock()
+        self.page_times: list[float] = []
+        self.first_page = None
+        self.last_page = None
+        self.errors = 0
+        self.bytes_out = 0
+
+    def record(self, seconds: float, size: int, error: bool) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            self.page_times.append(seconds)
+            self.bytes_out += size
+            self.errors += int(error)
+            if self.first_page is None:
+                self.first_page = now - seconds
+            self.last_page = now
+
+    def page_url(self, i: int) -> str:
+        # every 10th URL is outside the default include patterns
+        section = "presse" if i % 10 == 9 else "sehenswertes/attraktionen"
+        return f"{self.base}/de/{section}/poi-{i:06d}"
+
+    def sitemap_index(self) -> bytes:
+        n_children = (self.pages + SITEMAP_CHUNK - 1) // SITEMAP_CHUNK
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>']
+        parts.append(
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        )
+        for c in range(n_children):
+            ext = "xml.gz" if c % 2 else "xml"
+            parts.append(
+                f"<sitemap><loc>{self.base}/sitemaps/{c}.{ext}</loc></sitemap>"
+            )
+        parts.append("</sitemapindex>")
+        return "".join(parts).encode("utf-8")
+
+    def child_sitemap(self, c: int) -> bytes:
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>']
+        parts.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
+        for i in range(c * SITEMAP_CHUNK, min(self.pages, (c + 1) * SITEMAP_CHUNK)):
+            parts.append(
+                f"<url><loc>{self.page_url(i)}</loc>"
+                f"<lastmod>2025-{1 + i % 12:02d}-{1 + i % 28:02d}</lastmod>"
+                "<changefreq>weekly</changefreq></url>"
+            )
+        parts.append("</urlset>")
+        return "".join(parts).encode("utf-8")
+
+    @staticmethod
+    def _nav_padding(page_kb: int) -> str:
+        """Menu markup that brings synthetic pages up to a realistic size."""
+        nav = []
+        size = 0
+        while size < page_kb * 1024:
+            item = (
+                f'<li class="nav__item"><a href="/de/sehenswertes/x-{len(nav)}">'
+                f"Navigation entry {len(nav)}</a></li>"
+            )
+            nav.append(item)
+            size += len(item)
+        return "".join(nav)
+
+    def page(self, i: int) -> bytes:
+        if self.fixtures:
+            return self.fixtures[i % len(self.fixtures)]
+        rec = self.seed[i % len(self.seed)]
+        url = self.page_url(i)
+        ld = json.dumps(jsonld_for(rec, url), ensure_ascii=False)
+        title = htmllib.escape(rec.get("name") or "")
+        return (
+            "<!DOCTYPE html><html lang=de><head><meta charset=utf-8>"
+            f"<title>{title}</title>"
+            f'<script type="application/ld+json">{ld}</script></head>'
+            f"<body><nav><ul>{self.nav}</ul></nav>"
+            f"<h1>{title}</h1><p>{htmllib.escape(rec.get('summary') or '')}</p>"
+            "</body></html>"
+        ).encode("utf-8")
+
+
+def make_handler(site: ReplaySite):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real origin
+
+        def log_message(self, *a):
+            pass
+
+        def send_body(self, status: int, body: bytes, ctype: str, extra=None):
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/robots.txt":
+                body = f"User-agent: *\nSitemap: {site.base}/sitemap.xml\n"
+                return self.send_body(200, body.encode(), "text/plain")
+            if path == "/sitemap.xml":
+                return self.send_body(200, site.sitemap_index(), "application/xml")
+            if path.startswith("/sitemaps/"):
+                name = path.rsplit("/", 1)[1]
+                body = site.child_sitemap(int(name.split(".", 1)[0]))
+                if name.endswith(".gz"):
+                    return self.send_body(200, gzip.compress(body), "application/gzip")
+                return self.send_body(200, body, "application/xml")
+            if "/poi-" in path:
+                t0 = time.perf_counter()
+                delay = site.latency + random.uniform(-site.jitter, site.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                if site.error_rate and random.random() < site.error_rate:
+                    status = random.choice((429, 503))
+                    self.send_body(status, b"busy", "text/plain", {"Retry-After": "1"})
+                    site.record(time.perf_counter() - t0, 4, True)
+                    return
+                body = site.page(int(path.rsplit("-", 1)[1]))
+                self.send_body(200, body, "text/html; charset=utf-8")
+                site.record(time.perf_counter() - t0, len(body), False)
+                return
+            self.send_body(404, b"not found", "text/plain")
+
+    return Handler
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    vals = sorted(values)
+    k = min(len(vals) - 1, max(0, round(p / 100 * (len(vals) - 1))))
+    return vals[k]
+
+
+def histogram_quantile(hist: dict, q: float) -> float:
+    """q-quantile of a stats-file histogram, interpolated inside its bucket."""
+    count = hist.get("count", 0)
+    if not count:
+        return 0.0
+    rank = q * count
+    seen, lower = 0, 0.0
+    for bound, c in hist["buckets"].items():
+        if bound == "+Inf":
+            return lower
+        upper = float(bound)
+        if c and seen + c >= rank:
+            return lower + (upper - lower) * (rank - seen) / c
+        seen += c
+        lower = upper
+    return lower
+
+
+def run_crawler(site: ReplaySite, concurrency: int, args, workdir: str) -> dict:
+    site.reset()
+    out = os.path.join(workdir, f"out_{site.pages}_{concurrency}.json")
+    stats = os.path.join(workdir, f"stats_{site.pages}_{concurrency}.json")
+    cmd = [
+        sys.executable,
+        str(HERE / "scrape_sc.py"),
+        "--root",
+        site.base,
+        "--out",
+        out,
+        "--delay",
+        "0",
+        "--concurrency",
+        str(concurrency),
+        "--max-concurrency",
+        str(concurrency * 4 if args.adaptive else 0),
+        "--no-cache",
+        "--state",
+        os.path.join(workdir, f"state_{site.pages}_{concurrency}.sqlite"),
+        "--stats-file",
+        stats,
+        "--stats-interval",
+        "3600",
+    ]
+    if args.workers is not None:
+        cmd += ["--workers", str(args.workers)]
+    if not args.archive:
+        cmd.append("--no-archive")
+    if args.page_dedup:
+        cmd.append("--page-dedup")
+    cmd += shlex.split(args.extra)
+
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=workdir
+    )
+    output = proc.stdout.read()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        sys.stderr.write(output.decode("utf-8", errors="replace"))
+        raise SystemExit(f"scrape_sc.py exited with {proc.returncode}")
+
+    try:
+        with open(out, "r", encoding="utf-8") as f:
+            n_records = len(json.load(f))
+    except (OSError, ValueError):
+        n_records = 0
+    try:
+        with open(stats, "r", encoding="utf-8") as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        snap = {}
+    fetch = snap.get("histograms", {}).get("fetch_seconds", {}).get("", {})
+    peak = snap.get("gauges", {}).get("in_flight_peak", {}).get("", 0)
+
+    fetched = len(site.page_times)
+    window = (site.last_page - site.first_page) if fetched and site.first_page else wall
+    rss_kb = rusage.ru_maxrss  # kilobytes on Linux
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+    return {
+        "pages": site.pages,
+        "concurrency": concurrency,
+        "in_flight_peak": int(peak),
+        "page_requests": fetched,
+        "errors": site.errors,
+        "records": n_records,
+        "wall_s": round(wall, 3),
+        "crawl_s": round(window, 3),
+        "pages_per_s": round(fetched / window, 2) if window > 0 else 0.0,
+        "p50_ms": round(histogram_quantile(fetch, 0.5) * 1000, 1),
+        "p99_ms": round(histogram_quantile(fetch, 0.99) * 1000, 1),
+        "srv_p50_ms": round(percentile(site.page_times, 50) * 1000, 1),
+        "srv_p99_ms": round(percentile(site.page_times, 99) * 1000, 1),
+        "mb_out": round(site.bytes_out / 1e6, 2),
+        "peak_rss_mb": round(rss_kb / 1024, 1),
+    }
+
+
+def print_table(rows: list[dict]) -> None:
+    cols = [
+        "pages",
+        "concurrency",
+        "in_flight_peak",
+        "page_requests",
+        "errors",
+        "records",
+        "crawl_s",
+        "pages_per_s",
+        "p50_ms",
+        "p99_ms",
+        "srv_p50_ms",
+        "srv_p99_ms",
+        "peak_rss_mb",
+    ]
+    widths = [max(len(c), *(len(str(r[c])) for r in rows)) for c in cols]
+    print(" | ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    print("-+-".join("-" * w for w in widths))
+    for r in rows:
+        print(" | ".join(str(r[c]).rjust(w) for c, w in zip(cols, widths)))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", default="200,1000")
+    ap.add_argument("--concurrency", default="1,8,32")
+    ap.add_argument("--latency-ms", type=float, default=30.0)
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--page-kb", type=int, default=60)
+    ap.add_argument("--fixtures", default="")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--adaptive", action="store_true")
+    ap.add_argument("--archive", action="store_true")
+    ap.add_argument("--page-dedup", action="store_true")
+    ap.add_argument("--extra", default="")
+    ap.add_argument("--json", dest="json_out", default="")
+    args = ap.parse_args()
+
+    fixtures = []
+    if args.fixtures:
+        fixtures = [
+            p.read_bytes() for p in sorted(pathlib.Path(args.fixtures).glob("*.html"))
+        ]
+        if not fixtures:
+            raise SystemExit(f"No *.html fixtures in {args.fixtures}")
+
+    site = ReplaySite(0, args.page_kb, fixtures)
+    site.latency = args.latency_ms / 1000
+    site.jitter = args.jitter_ms / 1000
+    site.error_rate = args.error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(site))
+    server.daemon_threads = True
+    site.base = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Replay server on {site.base}")
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="bench_crawl_") as workdir:
+        for pages in [int(x) for x in args.pages.split(",") if x.strip()]:
+            site.pages = pages
+            for conc in [int(x) for x in args.concurrency.split(",") if x.strip()]:
+                print(f"  crawling {pages} pages @ concurrency {conc} ...")
+                rows.append(run_crawler(site, conc, args, workdir))
+    server.shutdown()
+
+    print()
+    print_table(rows)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote results → {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Set-based text classification of enriched records in DuckDB
+-----------------------------------------------------------
+Computes the text-derived fields of enrich.py for a whole catalog in one
+DuckDB query instead of per record in Python:
+
+  closed_days          dates in the closure sentences of opening_hours_full_text
+  accessibility_state  "full" | "none" | "unknown" from accessibility_full_text
+  opening_all_year     "ganzjährig" in opening_hours_full_text
+
+The SQL patterns are RE2 translations of enrich.py's Python regexes and give
+the same results on the texts they are used for: Python's Unicode `\\s`,
+`\\d` and `\\b` only differ from RE2's ASCII ones around non-ASCII
+letters, digits and spaces, so closure sentences containing such characters
+(umlauts only when they touch a date) are handed back to
+enrich.extract_closed_days_from_text.
+
+USAGE
+  python classify_batch.py --in enriched.json --out enriched.json
+
+  from classify_batch import classify_records
+  classify_records(records)   # updates the three fields in place
+
+enrich.py --batch-classify runs this after enriching instead of classifying
+each record on its own.
+"""
+
+import argparse
+import json
+
+import duckdb
+import pyarrow as pa
+
+from enrich import MONTH_MAP, extract_closed_days_from_text
+
+# Python's str `\s` (str.isspace) as an RE2 class; RE2's own `\s` is ASCII only
+PY_SPACE = (
+    r"[\t\n\x0b\x0c\r\x1c-\x1f \x{85}\x{a0}\x{1680}\x{2000}-\x{200a}"
+    r"\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]"
+)
+_MONTHS = (
+    "j[äa]nner|jaenner|januar|jan|februar|feb|m[äa]rz|maerz|mrz|april|apr|mai"
+    "|juni|jun|juli|jul|august|aug|september|sep|sept|oktober|okt|oct|november"
+    "|nov|dezember|dez|dec|january|february|march|april|may|june|july|august"
+    "|september|october|november|december"
+)
+_UMLAUT = "äöüÄÖÜß"
+
+# RE2 versions of enrich.RE_CLOSED_CHUNK_SPLIT, CLOSE_HINTS, RE_DATE_NUMERIC,
+# RE_DATE_NAMED, RE_ACCESS_FULL, RE_ACCESS_NONE and RE_ALL_YEAR. The compact
+# "24./25.12." pattern is left out: it needs dots, and chunks are cut at dots.
+SQL_CHUNK_SPLIT = r"[\n.;!]+"
+SQL_CLOSE_HINTS = rf"(?i)(?:geschlossen|schließt|schliesst|closed|no{PY_SPACE}*entry)"
+SQL_DATE_NUMERIC = r"\b([0-9]{1,2})[.\-/]([0-9]{1,2})(?:[.\-/]([0-9]{2,4}))?\b"
+SQL_DATE_NAMED = rf"(?i)\b([0-9]{{1,2}})\.?{PY_SPACE}*({_MONTHS})\b"
+SQL_ACCESS_FULL = rf"(?i)barrierefrei(?:{PY_SPACE}*-{PY_SPACE}*)?zug(?:ä|ae)nglich"
+SQL_ACCESS_NONE = rf"(?i)nicht{PY_SPACE}+barrierefrei"
+SQL_ALL_YEAR = r"(?i)ganzj(?:ä|ae)hrig"
+# where RE2 and Python could disagree: umlauts right after a digit or month
+# name or before a digit, and (checked on the chunk with ASCII and umlauts
+# removed) any other non-ASCII letter, digit or space. Dashes, quotes, € etc.
+# are non-word, non-space characters for both engines.
+SQL_EDGE = rf"[0-9][{_UMLAUT}]|[{_UMLAUT}][0-9]|(?i:{_MONTHS})[{_UMLAUT}]"
+SQL_ASCII_OR_UMLAUT = rf"[\x00-\x7f{_UMLAUT}]+"
+SQL_WORD_OR_SPACE = rf"\pL|\pN|{PY_SPACE}"
+
+CLASSIFY_SQL = f"""
+WITH chunks AS (
+    SELECT rid, unnest(parts) AS chunk, generate_subscripts(parts, 1) AS ci
+    FROM (
+        SELECT rid, string_split_regex(opening, '{SQL_CHUNK_SPLIT}') AS parts
+        FROM texts
+        WHERE opening IS NOT NULL
+    )
+),
+closing AS (
+    SELECT rid, ci, chunk
+    FROM chunks
+    WHERE regexp_matches(chunk, '{SQL_CLOSE_HINTS}')
+      AND regexp_matches(chunk, '[0-9]|[^\\x00-\\x7f]')
+),
+edge AS (
+    SELECT DISTINCT rid
+    FROM closing
+    WHERE regexp_matches(chunk, '{SQL_EDGE}')
+       OR regexp_matches(
+              regexp_replace(chunk, '{SQL_ASCII_OR_UMLAUT}', '', 'g'),
+              '{SQL_WORD_OR_SPACE}')
+),
+numeric AS (
+    SELECT rid, ci, 0 AS kind, unnest(d) AS day, unnest(m) AS month,
+           generate_subscripts(d, 1) AS mi
+    FROM (
+        SELECT rid, ci,
+               regexp_extract_all(chunk, '{SQL_DATE_NUMERIC}', 1) AS d,
+               regexp_extract_all(chunk, '{SQL_DATE_NUMERIC}', 2) AS m
+        FROM closing
+    )
+),
+named AS (
+    SELECT rid, ci, 1 AS kind, unnest(d) AS day, unnest(m) AS month_name,
+           generate_subscripts(d, 1) AS mi
+    FROM (
+        SELECT rid, ci,
+               regexp_extract_all(chunk, '{SQL_DATE_NAMED}', 1) AS d,
+               regexp_extract_all(chunk, '{SQL_DATE_NAMED}', 2) AS m
+        FROM closing
+    )
+),
+dates AS (
+    SELECT rid, ci, kind, mi, day::INT AS day, month::INT AS month FROM numeric
+    UNION ALL
+    SELECT n.rid, n.ci, n.kind, n.mi, n.day::INT, mm.month
+    FROM named n
+    JOIN months mm
+      ON mm.name = replace(replace(replace(lower(n.month_name),
+                   'ä', 'ae'), 'ö', 'oe'), 'ü', 'ue')
+),
+first_seen AS (
+    -- position of a date in the Python loop: chunk, numeric before named, match
+    SELECT rid, day, month, min(ci * 4294967296 + kind * 2147483648 + mi) AS pos
+    FROM dates
+    WHERE day BETWEEN 1 AND 31 AND month BETWEEN 1 AND 12
+    GROUP BY rid, day, month
+),
+closed AS (
+    -- list_sort orders the structs by their first field, pos
+    SELECT rid,
+           list_transform(
+               list_sort(list({{'pos': pos, 'day': day, 'month': month}})),
+               x -> {{'day': x.day, 'month': x.month}}
+           ) AS closed_days
+    FROM first_seen
+    GROUP BY rid
+)
+SELECT t.rid,
+       coalesce(c.closed_days, []) AS closed_days,
+       e.rid IS NOT NULL AS edge,
+       CASE
+           WHEN regexp_matches(t.access, '{SQL_ACCESS_FULL}') THEN 'full'
+           WHEN regexp_matches(t.access, '{SQL_ACCESS_NONE}') THEN 'none'
+           ELSE 'unknown'
+       END AS accessibility_state,
+       coalesce(regexp_matches(t.opening, '{SQL_ALL_YEAR}'), false)
+           AS opening_all_year
+FROM texts t
+LEFT JOIN closed c USING (rid)
+LEFT JOIN edge e USING (rid)
+ORDER BY t.rid
+"""
+
+
+def classify_texts(
+    opening: list[str | None],
+    access: list[str | None],
+    con: duckdb.DuckDBPyConnection | None = None,
+) -> tuple[list[dict], int]:
+    """
+    closed_days / accessibility_state / opening_all_year per text pair, and
+    how many closed_days lists came from the Python fallback.
+    """
+    con = con or duckdb.connect()
+    con.register(
+        "texts",
+        pa.table(
+            {
+                "rid": pa.array(range(len(opening)), pa.int64()),
+                "opening": pa.array(opening, pa.string()),
+                "access": pa.array(access, pa.string()),
+            }
+        ),
+    )
+    con.register(
+        "months",
+        pa.table(
+            {
+                "name": pa.array(list(MONTH_MAP), pa.string()),
+                "month": pa.array(list(MONTH_MAP.values()), pa.int32()),
+            }
+        ),
+    )
+    try:
+        rows = con.execute(CLASSIFY_SQL).fetchall()
+    finally:
+        con.unregister("texts")
+        con.unregister("months")
+    out = []
+    fallback = 0
+    for rid, closed_days, edge, state, all_year in rows:
+        if edge:
+            fallback += 1
+            closed_days = extract_closed_days_from_text(opening[rid])
+        out.append(
+            {
+                "closed_days": closed_days,
+                "accessibility_state": state,
+                "opening_all_year": all_year,
+            }
+        )
+    return out, fallback
+
+
+def classify_records(records: list[dict], con=None) -> int:
+    """
+    Set closed_days, accessibility_state and opening_all_year (top-level and
+    in opening_hours) on every record in place; returns the number of records
+    whose closed days were extracted in Python.
+    """
+    opening = [r.get("opening_hours_full_text") or None for r in records]
+    access = [r.get("accessibility_full_text") for r in records]
+    results, fallback = classify_texts(opening, access, con)
+    for rec, res in zip(records, results):
+        if res["closed_days"]:
+            rec["closed_days"] = res["closed_days"]
+        else:
+            rec.pop("closed_days", None)
+        rec["opening_all_year"] = res["opening_all_year"]
+        if isinstance(rec.get("opening_hours"), dict):
+            rec["opening_hours"]["opening_all_year"] = res["opening_all_year"]
+        rec["accessibility_state"] = res["accessibility_state"]
+    return fallback
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="inp", required=True)
+    ap.add_argument("--out", dest="out", required=True)
+    args = ap.parse_args()
+
+    with open(args.inp, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    fallback = classify_records(data)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(
+        f"Classified {len(data)} records ({fallback} closed_days in Python) "
+        f"→ {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Crawl instrumentation: counters, latency histograms and live export
+-------------------------------------------------------------------
+`Metrics` collects labelled counters and fixed-bucket histograms from any
+thread. scrape_sc.py records per-stage latencies (connect, ttfb, transfer,
+jsonld, html_parse, extract, write, dedup), responses per HTTP status, pages
+and records per URL pattern, bytes transferred and records per page, plus
+fetch_seconds: each request as the crawl loop sees it (dispatch -> body),
+in finer FETCH_BUCKETS so bench_crawl.py can compare runs.
+
+Export:
+  start_stats_writer(metrics, "stats.json", 10)  # JSON snapshot every 10 s
+  serve_metrics(metrics, 9464)                   # GET /metrics (Prometheus text)
+                                                 # GET /stats   (JSON snapshot)
+
+`timed_adapter()` returns a requests HTTPAdapter whose connections report
+their connect time (DNS + TCP + TLS), which requests does not expose.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# seconds, roughly log-spaced from 1 ms to 2 min
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    120.0,
+)
+# 1 ms to ~2 min, each bucket 25% wider than the previous one
+FETCH_BUCKETS = tuple(round(0.001 * 1.25**i, 6) for i in range(53))
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {str(b): c for b, c in zip((*self.bounds, "+Inf"), self.counts)},
+        }
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prom_escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(key: tuple) -> str:
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+class Metrics:
+    """Thread-safe labelled counters and histograms."""
+
+    def __init__(self, prefix: str = "crawler"):
+        self.prefix = prefix
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._gauges: dict[str, dict[tuple, float]] = {}
+        self._hists: dict[str, dict[tuple, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                h = series[key] = Histogram(buckets)
+            h.observe(value)
+
+    def total(self, name: str, **labels) -> tuple[int, float]:
+        """(count, sum) of a histogram series, or (0, value) of a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            h = self._hists.get(name, {}).get(key)
+            if h is not None:
+                return h.count, h.sum
+            return 0, self._counters.get(name, {}).get(key, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started,
+                "uptime_s": round(time.time() - self.started, 3),
+                "counters": {
+                    name: {_label_str(k): v for k, v in series.items()}
+                    for name, series in self._counters.items()
+                },
+                "gauges": {
+                    name: {_label_str(k): v for k, v in series.items()}
+                    for name, series in self._gauges.items()
+                },
+                "histograms": {
+                    name: {_label_str(k): h.to_dict() for k, h in series.items()}
+                    for name, series in self._hists.items()
+                },
+            }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format."""
+
+        def fmt(key: tuple, extra: tuple = ()) -> str:
+            pairs = [*key, *extra]
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_prom_escape(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} counter")
+                for key, v in series.items():
+                    lines.append(f"{full}{fmt(key)} {v}")
+            for name, series in sorted(self._gauges.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} gauge")
+                for key, v in series.items():
+                    lines.append(f"{full}{fmt(key)} {v}")
+            for name, series in sorted(self._hists.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} histogram")
+                for key, h in series.items():
+                    cum = 0
+                    for b, c in zip((*h.bounds, "+Inf"), h.counts):
+                        cum += c
+                        lines.append(f"{full}_bucket{fmt(key, (('le', b),))} {cum}")
+                    lines.append(f"{full}_sum{fmt(key)} {h.sum}")
+                    lines.append(f"{full}_count{fmt(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+
+def start_stats_writer(metrics: Metrics, path: str, interval: float = 10.0):
+    """Write metrics.snapshot() to `path` every `interval` s; returns stop()."""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            metrics.write_json(path)
+
+    t = threading.Thread(target=loop, name="stats-writer", daemon=True)
+    t.start()
+
+    def stop_writer():
+        stop.set()
+        t.join()
+        metrics.write_json(path)
+
+    return stop_writer
+
+
+def serve_metrics(metrics: Metrics, port: int, host: str = "127.0.0.1"):
+    """Serve /metrics (Prometheus text) and /stats (JSON) in a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith("/metrics"):
+                body = metrics.prometheus().encode("utf-8")
+                ctype = "text/plain; version=0.0.4"
+            elif self.path.startswith("/stats"):
+                body = json.dumps(metrics.snapshot(), indent=2).encode("utf-8")
+                ctype = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def timed_adapter(metrics: Metrics, **adapter_kwargs) -> HTTPAdapter:
+    """HTTPAdapter whose new connections record stage_seconds{stage=connect}."""
+
+    def timed(conn_cls):
+        class Timed(conn_cls):
+            def connect(self):
+                t0 = time.perf_counter()
+                try:
+                    return super().connect()
+                finally:
+                    metrics.observe(
+                        "stage_seconds", time.perf_counter() - t0, stage="connect"
+                    )
+                    metrics.inc("connections_opened_total")
+
+        return Timed
+
+    class TimedHTTPPool(HTTPConnectionPool):
+        ConnectionCls = timed(HTTPConnection)
+
+    class TimedHTTPSPool(HTTPSConnectionPool):
+        ConnectionCls = timed(HTTPSConnection)
+
+    class TimedAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": TimedHTTPPool,
+                "https": TimedHTTPSPool,
+            }
+
+    return TimedAdapter(**adapter_kwargs)
@@ -0,0 +1,146 @@
+"""
+Persisted crawl state for incremental crawls
+--------------------------------------------
+One row per page URL: the sitemap <lastmod>/<changefreq> seen when it was last
+fetched, when that was, a hash of the fetched HTML and the ids of the records
+extracted from it. scrape_sc.py --incremental uses it to fetch only pages that
+are new or changed and to reuse the previous records for everything else.
+
+Pages whose content duplicated an earlier page of the same crawl are listed in
+a second table (URL -> canonical URL), so later crawls can skip them
+(scrape_sc.py --prune-duplicates).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+DEFAULT_STATE_PATH = ".crawl_state.sqlite"
+
+# re-fetch interval (seconds) for pages without <lastmod>
+CHANGEFREQ_SECONDS = {
+    "always": 0,
+    "hourly": 3600,
+    "daily": 86400,
+    "weekly": 7 * 86400,
+    "monthly": 30 * 86400,
+    "yearly": 365 * 86400,
+    "never": float("inf"),
+}
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    lastmod: str | None = None
+    changefreq: str | None = None
+
+
+class PageState(NamedTuple):
+    url: str
+    lastmod: str | None
+    changefreq: str | None
+    fetched_at: float
+    content_hash: str | None
+    record_ids: list[str]
+
+
+def content_hash(html: str | bytes) -> str:
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    return hashlib.sha256(html).hexdigest()
+
+
+class CrawlState:
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url          TEXT PRIMARY KEY,
+                lastmod      TEXT,
+                changefreq   TEXT,
+                fetched_at   REAL NOT NULL,
+                content_hash TEXT,
+                record_ids   TEXT NOT NULL DEFAULT '[]'
+            )
+            """)
+        self._con.execute("""
+            CREATE TABLE IF NOT EXISTS duplicates (
+                url        TEXT PRIMARY KEY,
+                canonical  TEXT NOT NULL,
+                kind       TEXT NOT NULL,      -- 'exact' or 'near'
+                distance   INTEGER NOT NULL,   -- SimHash bits (0 for exact)
+                seen_at    REAL NOT NULL
+            )
+            """)
+        self._con.commit()
+
+    def get(self, url: str) -> PageState | None:
+        with self._lock:
+            row = self._con.execute(
+                "SELECT url, lastmod, changefreq, fetched_at, content_hash, record_ids "
+                "FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        return PageState(*row[:5], json.loads(row[5]))
+
+    def needs_fetch(self, entry: SitemapEntry, now: float | None = None) -> bool:
+        """New URL, changed <lastmod>, or <changefreq> interval elapsed."""
+        prev = self.get(entry.loc)
+        if prev is None:
+            return True
+        if entry.lastmod:
+            return entry.lastmod != prev.lastmod
+        interval = CHANGEFREQ_SECONDS.get((entry.changefreq or "").strip().lower())
+        if interval is None:
+            return True
+        return (now or time.time()) - prev.fetched_at >= interval
+
+    def record(
+        self, entry: SitemapEntry, html_hash: str | None, record_ids: list[str]
+    ) -> None:
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, lastmod, changefreq, fetched_at, content_hash, record_ids) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    entry.loc,
+                    entry.lastmod,
+                    entry.changefreq,
+                    time.time(),
+                    html_hash,
+                    json.dumps(record_ids),
+                ),
+            )
+            # a fresh fetch supersedes an earlier duplicate verdict
+            self._con.execute("DELETE FROM duplicates WHERE url = ?", (entry.loc,))
+            self._con.commit()
+
+    def record_duplicate(
+        self, url: str, canonical: str, kind: str, distance: int = 0
+    ) -> None:
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO duplicates "
+                "(url, canonical, kind, distance, seen_at) VALUES (?, ?, ?, ?, ?)",
+                (url, canonical, kind, distance, time.time()),
+            )
+            self._con.commit()
+
+    def duplicate_urls(self) -> set[str]:
+        with self._lock:
+            rows = self._con.execute("SELECT url FROM duplicates").fetchall()
+        return {r[0] for r in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
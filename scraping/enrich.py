@@ -10,28 +10,67 @@ Enrich Salzburg POIs with:
 - NEW fixed fields on every record:
     unrestricted_access   (bool)            # always True (as requested)
     dogs_allowed          (bool)            # always False (as requested)
-    opening_hours         (object)          # default weekly schedule below
-        mo/tu/we/th/fr/sa/su: {from:int, to:int}
+    opening_hours         (object)          # parsed from the opening text,
+                                            # else the default schedule below
+        mo/tu/we/th/fr/sa/su: {from:int, to:int}   # to < from: past midnight
         opened_on_holidays: bool
         opening_all_year:   bool            # derived from text, same as top-level
-- NEW field:
+- NEW fields:
     closed_days           (array of {day:int, month:int})
+    opening_hours_bits    (string)          # 7x96 quarter-hour bitmap, hex;
+                                            # see opening_hours.py (is_open)
 
 Run:
-  pip install requests beautifulsoup4==4.12.2 lxml>=5.3.0 tqdm
-  python enrich_sections.py --in scraped.json --out enriched.json --delay 0.7
+  pip install requests beautifulsoup4==4.12.2 lxml>=5.3.0 tqdm numpy
+  python enrich.py --in scraped.json --out enriched.json --delay 0.7
+
+Items are enriched by --workers threads (default 8) sharing one pooled
+keep-alive session. --delay (or --rate/--burst) is a per-host token-bucket
+limit shared by all workers, so going wider never exceeds the request rate of
+the old sequential loop; 429/5xx answers and connection errors are retried
+--retries times with exponential backoff (honouring Retry-After). Only
+requests that go out take a token, retries included; pages served from the
+cache or the archive never wait. The output keeps the input order.
+
+Pages are fetched through the on-disk HTTP cache shared with scrape_sc.py
+(--cache, default .http_cache.sqlite), so unchanged pages come back as 304s.
+Use --cache-max-age N to skip revalidation for pages fetched in the last N
+seconds (e.g. right after a crawl), or --no-cache to always download.
+
+With --archive DIR (scrape_sc.py's page archive) pages archived by the crawler
+are read from disk instead of being requested; add --offline to never touch
+the network, e.g. to re-run changed extractors over a finished crawl.
+
+Extractor results are cached per (URL, normalised page hash, extractor version)
+in --result-cache (default .enrich_cache.sqlite, least recently used results
+evicted beyond --result-cache-mb), so an unchanged page is not parsed again.
+Bump an entry of EXTRACTOR_VERSIONS after changing an extractor, or drop its
+results with --invalidate NAME (comma-separated, or "all").
+
+--batch-classify derives closed_days, accessibility_state and opening_all_year
+for all records in one DuckDB query (classify_batch.py) after enriching,
+instead of per record.
 """
 
 import argparse
 import json
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
+from enrich_cache import DEFAULT_MAX_BYTES, DEFAULT_RESULT_CACHE_PATH, ResultCache
+from http_cache import DEFAULT_CACHE_PATH, HttpCache, cached_get
+from opening_hours import DAY_KEYS, encode_bits, parse_opening_hours, to_schedule
+from page_archive import ArchiveReader
+from page_fingerprint import body_hash
+from ratelimit import HostRateLimiter, parse_retry_after
+
 UA = "Mozilla/5.0 (compatible; SalzburgSectionEnricher/1.4; +https://example.org)"
 
 RE_ALL_YEAR = re.compile(r"ganzj(?:ä|ae)hrig", re.IGNORECASE)
@@ -53,9 +92,11 @@ DEFAULT_OPENING_HOURS = {
 # ---- helpers ---------------------------------------------------------------
 
 
-def fetch_html(url: str, timeout=25) -> str | None:
+def fetch_html(
+    url: str, timeout=25, cache: HttpCache | None = None, session=requests
+) -> str | None:
     try:
-        r = requests.get(url, headers={"user-agent": UA}, timeout=timeout)
+        r = cached_get(session, url, cache, headers={"user-agent": UA}, timeout=timeout)
         if r.status_code >= 400:
             return None
         return r.text
@@ -63,6 +104,69 @@ def fetch_html(url: str, timeout=25) -> str | None:
         return None
 
 
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class LimitedSession(requests.Session):
+    """
+    Session that retries 429/5xx and connection errors itself, so that every
+    attempt takes a token from `limiter` (when given) and a Retry-After
+    pauses the whole host instead of one sleeping thread.
+    """
+
+    def __init__(
+        self,
+        limiter: HostRateLimiter | None = None,
+        retries: int = 3,
+        backoff: float = 1.0,
+    ):
+        super().__init__()
+        self.limiter = limiter
+        self.retries = max(0, retries)
+        self.backoff = backoff
+
+    def request(self, method, url, *args, **kwargs):
+        attempt = 0
+        while True:
+            if self.limiter:
+                self.limiter.acquire(url)
+            try:
+                r = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                r = None
+            if r is not None and (
+                r.status_code not in RETRY_STATUSES or attempt >= self.retries
+            ):
+                return r
+            delay = self.backoff * 2**attempt
+            if r is not None:
+                retry_after = parse_retry_after(r.headers.get("Retry-After")) or 0.0
+                r.close()
+                if self.limiter:
+                    self.limiter.pause(url, retry_after)  # acquire() waits it out
+                else:
+                    delay = max(delay, retry_after)
+            time.sleep(delay)
+            attempt += 1
+
+
+def make_session(
+    pool_size: int,
+    retries: int = 3,
+    backoff: float = 1.0,
+    limiter: HostRateLimiter | None = None,
+):
+    """Pooled keep-alive LimitedSession."""
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session = LimitedSession(limiter, retries, backoff)
+    session.headers["user-agent"] = UA
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def _normalize_whitespace(text: str) -> str:
     text = text.replace("\r", "")
     text = re.sub(r"\n{3,}", "\n\n", text)
@@ -85,138 +189,173 @@ def _text_from_wysiwyg(container) -> str:
     return _normalize_whitespace("\n".join(parts))
 
 
-# ---- extractors: price / opening / accessibility / images ------------------
+# ---- section index ---------------------------------------------------------
 
+HEADING_TAGS = {"h2", "h3", "h4", "strong", "b"}
+# accordion panels: id prefix of the div[id^=...] holding .panel-body .wysiwyg
+PANEL_ID_PREFIXES = {
+    "price": "price-acc-detail",
+    "opening": "ot_acc-detail-0",
+    "accessibility": "ot_acc-detail-1",
+}
+GALLERY_CLASSES = {
+    "gallery",
+    "gallery-main",
+    "js-sliderThumbnav",
+    "js-sliderThumbnav__main",
+}
 
-def extract_prices(soup: BeautifulSoup, base_url: str) -> str:
-    blocks = []
-    for div in soup.select('div[id^="price-acc-detail"] .panel-body .wysiwyg'):
-        blocks.append(_text_from_wysiwyg(div))
-    if not blocks:
-        for h in soup.find_all(["h2", "h3", "h4", "strong", "b"]):
-            txt = (h.get_text(" ", strip=True) or "").lower()
-            if any(
-                w in txt
-                for w in [
-                    "preis",
-                    "preise",
-                    "eintritt",
-                    "admission",
-                    "ticket",
-                    "tickets",
-                    "kosten",
-                ]
-            ):
-                sib = h.find_next_sibling()
-                hops = 0
-                while sib and hops < 4:
-                    if "wysiwyg" in " ".join(sib.get("class", [])) or sib.name in [
-                        "p",
-                        "ul",
-                        "ol",
-                        "div",
-                        "table",
-                    ]:
-                        blocks.append(
-                            _normalize_whitespace(sib.get_text("\n", strip=True))
-                        )
-                    sib = sib.find_next_sibling()
-                    hops += 1
+PRICE_WORDS = [
+    "preis",
+    "preise",
+    "eintritt",
+    "admission",
+    "ticket",
+    "tickets",
+    "kosten",
+]
+OPENING_WORDS = [
+    "öffnungszeiten",
+    "oeffnungszeiten",
+    "opening hours",
+    "opening time",
+    "geöffnet",
+    "open",
+    "geschlossen",
+]
+ACCESS_WORDS = ["barriere", "barrierefrei", "accessibility", "wheelchair", "rollstuhl"]
+
+
+class SectionIndex:
+    """
+    Everything the extractors look at, collected in one pass over the page:
+    headings (h2-h4/strong/b) with their lower-cased text, the .wysiwyg
+    blocks (for the *acc-detail* panels) and the gallery containers. The
+    section after a heading (its next four sibling tags) and the text of
+    those blocks are computed on first use and shared by all extractors.
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self.headings = []  # (tag, lower-cased text), document order
+        self.galleries = []
+        self._wysiwyg = []
+        for tag in soup.find_all(True):
+            if tag.name in HEADING_TAGS:
+                txt = (tag.get_text(" ", strip=True) or "").lower()
+                self.headings.append((tag, txt))
+            classes = tag.get("class")
+            if classes:
+                if "wysiwyg" in classes:
+                    self._wysiwyg.append(tag)
+                if GALLERY_CLASSES.intersection(classes):
+                    self.galleries.append(tag)
+        self._sections = {}
+        self._texts = {}
+
+    def panel_blocks(self, kind: str) -> list:
+        """`div[id^=<prefix>] .panel-body .wysiwyg` for one panel kind."""
+        prefix = PANEL_ID_PREFIXES[kind]
+        found = []
+        for w in self._wysiwyg:
+            in_body = False
+            for p in w.parents:
+                if in_body and p.name == "div" and p.get("id", "").startswith(prefix):
+                    found.append(w)
+                    break
+                if "panel-body" in (p.get("class") or ()):
+                    in_body = True
+        return found
+
+    def section(self, heading) -> list:
+        """Up to four sibling tags following `heading`."""
+        sibs = self._sections.get(id(heading))
+        if sibs is None:
+            sibs = []
+            sib = heading.find_next_sibling()
+            hops = 0
+            while sib and hops < 4:
+                sibs.append(sib)
+                sib = sib.find_next_sibling()
+                hops += 1
+            self._sections[id(heading)] = sibs
+        return sibs
+
+    def block_text(self, tag) -> str:
+        text = self._texts.get(id(tag))
+        if text is None:
+            text = self._texts[id(tag)] = _normalize_whitespace(
+                tag.get_text("\n", strip=True)
+            )
+        return text
+
+    def heading_blocks(self, keywords, block_tags) -> list[str]:
+        """Texts of the blocks after every heading containing a keyword."""
+        blocks = []
+        for h, txt in self.headings:
+            if any(w in txt for w in keywords):
+                for sib in self.section(h):
+                    if (
+                        "wysiwyg" in " ".join(sib.get("class", []))
+                        or sib.name in block_tags
+                    ):
+                        blocks.append(self.block_text(sib))
+        return blocks
+
+
+def _join_unique(blocks: list[str], limit: int) -> str:
     out, seen = [], set()
     for b in blocks:
         b = (b or "").strip()
         if b and b.lower() not in seen:
             seen.add(b.lower())
             out.append(b)
-    return "\n\n".join(out[:3])
+    return "\n\n".join(out[:limit])
+
+
+# ---- extractors: price / opening / accessibility / images ------------------
 
 
-def extract_opening_hours_text(soup: BeautifulSoup) -> str:
-    blocks = []
-    for div in soup.select('div[id^="ot_acc-detail-0"] .panel-body .wysiwyg'):
-        blocks.append(_text_from_wysiwyg(div))
+def extract_prices(
+    soup: BeautifulSoup, base_url: str, index: SectionIndex | None = None
+) -> str:
+    index = index or SectionIndex(soup)
+    blocks = [_text_from_wysiwyg(div) for div in index.panel_blocks("price")]
     if not blocks:
-        for h in soup.find_all(["h2", "h3", "h4", "strong", "b"]):
-            txt = (h.get_text(" ", strip=True) or "").lower()
-            if any(
-                w in txt
-                for w in [
-                    "öffnungszeiten",
-                    "oeffnungszeiten",
-                    "opening hours",
-                    "opening time",
-                    "geöffnet",
-                    "open",
-                    "geschlossen",
-                ]
-            ):
-                sib = h.find_next_sibling()
-                hops = 0
-                while sib and hops < 4:
-                    if "wysiwyg" in " ".join(sib.get("class", [])) or sib.name in [
-                        "p",
-                        "ul",
-                        "ol",
-                        "div",
-                        "table",
-                    ]:
-                        blocks.append(
-                            _normalize_whitespace(sib.get_text("\n", strip=True))
-                        )
-                    sib = sib.find_next_sibling()
-                    hops += 1
-    out, seen = [], set()
-    for b in blocks:
-        b = (b or "").strip()
-        if b and b.lower() not in seen:
-            seen.add(b.lower())
-            out.append(b)
-    return "\n\n".join(out[:3])
+        blocks = index.heading_blocks(PRICE_WORDS, ("p", "ul", "ol", "div", "table"))
+    return _join_unique(blocks, 3)
 
 
-def extract_accessibility(soup: BeautifulSoup) -> str:
-    blocks = []
-    for div in soup.select('div[id^="ot_acc-detail-1"] .panel-body .wysiwyg'):
-        blocks.append(_text_from_wysiwyg(div))
+def extract_opening_hours_text(
+    soup: BeautifulSoup, index: SectionIndex | None = None
+) -> str:
+    index = index or SectionIndex(soup)
+    blocks = [_text_from_wysiwyg(div) for div in index.panel_blocks("opening")]
     if not blocks:
-        for h in soup.find_all(["h2", "h3", "h4", "strong", "b"]):
-            txt = (h.get_text(" ", strip=True) or "").lower()
-            if any(
-                w in txt
-                for w in [
-                    "barriere",
-                    "barrierefrei",
-                    "accessibility",
-                    "wheelchair",
-                    "rollstuhl",
-                ]
-            ):
-                sib = h.find_next_sibling()
-                hops = 0
-                while sib and hops < 4:
-                    if "wysiwyg" in " ".join(sib.get("class", [])) or sib.name in [
-                        "p",
-                        "ul",
-                        "ol",
-                        "div",
-                    ]:
-                        blocks.append(
-                            _normalize_whitespace(sib.get_text("\n", strip=True))
-                        )
-                    sib = sib.find_next_sibling()
-                    hops += 1
-    out, seen = [], set()
-    for b in blocks:
-        b = (b or "").strip()
-        if b and b.lower() not in seen:
-            seen.add(b.lower())
-            out.append(b)
-    return "\n\n".join(out[:2])
+        blocks = index.heading_blocks(OPENING_WORDS, ("p", "ul", "ol", "div", "table"))
+    return _join_unique(blocks, 3)
 
 
-def extract_impressions(soup: BeautifulSoup, base_url: str) -> list[str]:
-    """Collect only HTTP/HTTPS image URLs (drop data: etc.)."""
+def extract_accessibility(
+    soup: BeautifulSoup, index: SectionIndex | None = None
+) -> str:
+    index = index or SectionIndex(soup)
+    blocks = [_text_from_wysiwyg(div) for div in index.panel_blocks("accessibility")]
+    if not blocks:
+        # unlike price/opening hours, tables are not taken here
+        blocks = index.heading_blocks(ACCESS_WORDS, ("p", "ul", "ol", "div"))
+    return _join_unique(blocks, 2)
+
+
+def extract_impressions(
+    soup: BeautifulSoup, base_url: str, index: SectionIndex | None = None
+) -> list[str]:
+    """
+    Collect only HTTP/HTTPS image URLs (drop data: etc.), in page order. All
+    srcset variants are kept; images.py groups them per asset.
+    """
+    index = index or SectionIndex(soup)
     urls: list[str] = []
+    seen: set[str] = set()
 
     def add(u: str):
         if not u:
@@ -226,13 +365,13 @@ def extract_impressions(soup: BeautifulSoup, base_url: str) -> list[str]:
         scheme = urlparse(u).scheme.lower()
         if scheme not in ("http", "https"):
             return
-        if u not in urls:
+        if u not in seen:
+            seen.add(u)
             urls.append(u)
 
     header = None
-    for h in soup.find_all(["h2", "h3"]):
-        txt = (h.get_text(" ", strip=True) or "").lower()
-        if "impressionen" in txt or "impressions" in txt:
+    for h, txt in index.headings:
+        if h.name in ("h2", "h3") and ("impressionen" in txt or "impressions" in txt):
             header = h
             break
 
@@ -248,9 +387,7 @@ def extract_impressions(soup: BeautifulSoup, base_url: str) -> list[str]:
             if not sib:
                 break
             containers.append(sib)
-    containers += soup.select(
-        ".gallery, .gallery-main, .js-sliderThumbnav, .js-sliderThumbnav__main"
-    )
+    containers += index.galleries
 
     for cont in containers:
         for pic in cont.find_all("picture"):
@@ -323,19 +460,25 @@ CLOSE_HINTS = re.compile(
     r"(geschlossen|schließt|schliesst|geschlossen\s*am|closed\s*on|closed|no\s*entry)",
     re.IGNORECASE,
 )
+RE_DATE_NUMERIC = re.compile(r"\b(\d{1,2})[\.\-\/](\d{1,2})(?:[\.\-\/](\d{2,4}))?\b")
+RE_DATE_COMPACT = re.compile(r"\b((?:\d{1,2}\.){2,})(\d{1,2})\.?\b")
+RE_DATE_NAMED = re.compile(
+    r"\b(\d{1,2})\.?\s*(j[äa]nner|jaenner|januar|jan|februar|feb|m[äa]rz|maerz|mrz|april|apr|mai|juni|jun|juli|jul|august|aug|september|sep|sept|oktober|okt|oct|november|nov|dezember|dez|dec|january|february|march|april|may|june|july|august|september|october|november|december)\b",
+    re.IGNORECASE,
+)
+RE_CLOSED_CHUNK_SPLIT = re.compile(r"[\n\.;!]+")
 
 
 def _extract_dates_numeric(blob: str):
     """Find numeric dates like 24.12., 1.1. or 24/12; returns (day, month) pairs."""
     results = []
-    pat = re.compile(r"\b(\d{1,2})[\.\-\/](\d{1,2})(?:[\.\-\/](\d{2,4}))?\b")
-    for m in pat.finditer(blob):
+    for m in RE_DATE_NUMERIC.finditer(blob):
         day = int(m.group(1))
         month = int(m.group(2))
         if 1 <= day <= 31 and 1 <= month <= 12:
             results.append({"day": day, "month": month})
     # compact forms like "24./25.12."
-    compact = re.findall(r"\b((?:\d{1,2}\.){2,})(\d{1,2})\.?\b", blob)
+    compact = RE_DATE_COMPACT.findall(blob)
     for seq, month in compact:
         try:
             month = int(month)
@@ -351,11 +494,7 @@ def _extract_dates_numeric(blob: str):
 def _extract_dates_named(blob: str):
     """Find dates like 24. Dezember, 1 January, 31 Okt."""
     results = []
-    pat = re.compile(
-        r"\b(\d{1,2})\.?\s*(j[äa]nner|jaenner|januar|jan|februar|feb|m[äa]rz|maerz|mrz|april|apr|mai|juni|jun|juli|jul|august|aug|september|sep|sept|oktober|okt|oct|november|nov|dezember|dez|dec|january|february|march|april|may|june|july|august|september|october|november|december)\b",
-        re.IGNORECASE,
-    )
-    for m in pat.finditer(blob):
+    for m in RE_DATE_NAMED.finditer(blob):
         day = int(m.group(1))
         mon_name = m.group(2).lower()
         mon_name = mon_name.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue")
@@ -372,7 +511,7 @@ def extract_closed_days_from_text(text: str):
     """
     if not text:
         return []
-    chunks = re.split(r"[\n\.;!]+", text)
+    chunks = RE_CLOSED_CHUNK_SPLIT.split(text)
     candidates = [c for c in chunks if CLOSE_HINTS.search(c)]
     pairs = []
     for c in candidates:
@@ -402,64 +541,134 @@ def classify_accessibility_state(access_text: str | None) -> str:
     return "unknown"
 
 
-def add_fixed_fields(enriched: dict, opening_all_year_flag: bool) -> None:
-    """Add required fixed fields to every entry."""
+def add_fixed_fields(
+    enriched: dict, opening_all_year_flag: bool, opening_text: str | None = None
+) -> None:
+    """
+    Add required fixed fields to every entry. The weekly schedule is parsed
+    from `opening_text` when possible, else DEFAULT_OPENING_HOURS is used.
+    """
     enriched["unrestricted_access"] = True
     enriched["dogs_allowed"] = False
-    opening_hours = {
-        "mo": dict(DEFAULT_OPENING_HOURS["mo"]),
-        "tu": dict(DEFAULT_OPENING_HOURS["tu"]),
-        "we": dict(DEFAULT_OPENING_HOURS["we"]),
-        "th": dict(DEFAULT_OPENING_HOURS["th"]),
-        "fr": dict(DEFAULT_OPENING_HOURS["fr"]),
-        "sa": dict(DEFAULT_OPENING_HOURS["sa"]),
-        "su": dict(DEFAULT_OPENING_HOURS["su"]),
-        "opened_on_holidays": DEFAULT_OPENING_HOURS["opened_on_holidays"],
-        "opening_all_year": bool(opening_all_year_flag),
-    }
+    parsed = parse_opening_hours(opening_text)
+    if parsed is not None:
+        schedule = to_schedule(parsed.bits)
+        holidays = parsed.opened_on_holidays
+        enriched["opening_hours_bits"] = encode_bits(parsed.bits)
+    else:
+        schedule = {day: DEFAULT_OPENING_HOURS[day] for day in DAY_KEYS}
+        holidays = None
+    if holidays is None:
+        holidays = DEFAULT_OPENING_HOURS["opened_on_holidays"]
+    opening_hours = {day: dict(schedule[day]) for day in DAY_KEYS}
+    opening_hours["opened_on_holidays"] = holidays
+    opening_hours["opening_all_year"] = bool(opening_all_year_flag)
     enriched["opening_hours"] = opening_hours
 
 
 # ---- main processing -------------------------------------------------------
 
 
-def process_item(item: dict, delay: float):
+# bump an extractor's version whenever its output changes: cached results of
+# older versions are then recomputed (see enrich_cache.py)
+EXTRACTOR_VERSIONS = {
+    "price": 1,
+    "opening_hours": 1,
+    "closed_days": 1,
+    "accessibility": 1,
+    "impressions": 1,
+}
+
+
+def _field(name: str, value) -> dict:
+    return {name: value} if value else {}
+
+
+def run_extractors(html, url: str, names) -> dict[str, dict]:
+    """Fields set by each of the page extractors in `names` (closed_days aside)."""
+    soup = BeautifulSoup(html, "lxml")
+    index = SectionIndex(soup)
+    results = {}
+    if "price" in names:
+        results["price"] = _field("price_full_text", extract_prices(soup, url, index))
+    if "opening_hours" in names:
+        text = extract_opening_hours_text(soup, index)
+        results["opening_hours"] = _field("opening_hours_full_text", text)
+    if "accessibility" in names:
+        text = extract_accessibility(soup, index)
+        results["accessibility"] = _field("accessibility_full_text", text)
+    if "impressions" in names:
+        imgs = extract_impressions(soup, url, index)
+        results["impressions"] = _field("impressions", imgs)
+    return results
+
+
+def process_item(
+    item: dict,
+    cache: HttpCache | None = None,
+    archive: ArchiveReader | None = None,
+    offline: bool = False,
+    session=requests,
+    results_cache: ResultCache | None = None,
+    classify: bool = True,
+):
+    """
+    Enrich one record. With classify=False, closed_days, opening_all_year and
+    accessibility_state are left as placeholders for classify_batch.py.
+    Rate limiting happens in `session` (see LimitedSession), only for pages
+    that are actually requested.
+    """
     url = item.get("url")
     enriched = dict(item)
 
     detected_opening_all_year = False
+    opening_text = None
 
     if url:
-        html = fetch_html(url)
+        # archived pages are raw bytes; BeautifulSoup detects their charset
+        html = archive.get(url) if archive else None
+        if html is None and not offline:
+            html = fetch_html(url, cache=cache, session=session)
         if html:
-            soup = BeautifulSoup(html, "lxml")
-            price_text = extract_prices(soup, url)
-            opening_text = extract_opening_hours_text(soup)
-            accessibility_text = extract_accessibility(soup)
-            imgs = extract_impressions(soup, url)
-
-            if price_text:
-                enriched["price_full_text"] = price_text
-            if opening_text:
-                enriched["opening_hours_full_text"] = opening_text
+            digest = None
+            results = {}
+            if results_cache:
+                raw = html.encode("utf-8") if isinstance(html, str) else html
+                digest = body_hash(raw)
+                results = results_cache.get(url, digest, EXTRACTOR_VERSIONS)
+            if "opening_hours" not in results:
+                results.pop("closed_days", None)  # derived from the opening text
+            missing = [n for n in EXTRACTOR_VERSIONS if n not in results]
+            fresh = {}
+            if any(n != "closed_days" for n in missing):
+                fresh = run_extractors(html, url, missing)
+                results.update(fresh)
+            opening_text = results["opening_hours"].get("opening_hours_full_text")
+            if not classify:
+                results["closed_days"] = {"closed_days": None}  # keeps key order
+            elif "closed_days" in missing:
                 # derive closed_days from opening text
-                closed = extract_closed_days_from_text(opening_text)
-                if closed:
-                    enriched["closed_days"] = closed
-            if accessibility_text:
-                enriched["accessibility_full_text"] = accessibility_text
-            if imgs:
-                enriched["impressions"] = imgs
+                closed = extract_closed_days_from_text(opening_text or "")
+                fresh["closed_days"] = results["closed_days"] = _field(
+                    "closed_days", closed
+                )
+            if results_cache and fresh:
+                results_cache.put(url, digest, fresh, EXTRACTOR_VERSIONS)
+
+            for name in EXTRACTOR_VERSIONS:
+                enriched.update(results[name])
 
-            detected_opening_all_year = bool(RE_ALL_YEAR.search(opening_text or ""))
+            if classify:
+                detected_opening_all_year = bool(RE_ALL_YEAR.search(opening_text or ""))
 
     enriched["opening_all_year"] = detected_opening_all_year
-    add_fixed_fields(enriched, detected_opening_all_year)
-    enriched["accessibility_state"] = classify_accessibility_state(
-        enriched.get("accessibility_full_text")
+    add_fixed_fields(enriched, detected_opening_all_year, opening_text)
+    enriched["accessibility_state"] = (
+        classify_accessibility_state(enriched.get("accessibility_full_text"))
+        if classify
+        else None
     )
 
-    time.sleep(delay)
     return enriched
 
 
@@ -467,15 +676,131 @@ def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="inp", required=True)
     ap.add_argument("--out", dest="out", required=True)
-    ap.add_argument("--delay", type=float, default=0.7)
+    ap.add_argument(
+        "--delay",
+        type=float,
+        default=0.7,
+        help="Seconds between requests to one host (used when --rate is not set)",
+    )
+    ap.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Max requests/second per host (default: 1/--delay)",
+    )
+    ap.add_argument(
+        "--burst", type=float, default=1.0, help="Token-bucket burst size per host"
+    )
+    ap.add_argument(
+        "--workers", type=int, default=8, help="Items enriched concurrently"
+    )
+    ap.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="Retries per page after 429/5xx or connection errors",
+    )
+    ap.add_argument(
+        "--cache",
+        default=DEFAULT_CACHE_PATH,
+        help="On-disk HTTP cache shared with scrape_sc.py (conditional GETs)",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Disable the HTTP cache")
+    ap.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=0.0,
+        help="Serve cached pages younger than this many seconds without revalidating",
+    )
+    ap.add_argument(
+        "--archive",
+        default="",
+        help="scrape_sc.py page archive to read pages from before fetching",
+    )
+    ap.add_argument(
+        "--offline",
+        action="store_true",
+        help="Never fetch: enrich only from --archive",
+    )
+    ap.add_argument(
+        "--result-cache",
+        default=DEFAULT_RESULT_CACHE_PATH,
+        help="Extractor results per (URL, page hash, extractor version)",
+    )
+    ap.add_argument(
+        "--no-result-cache", action="store_true", help="Always run every extractor"
+    )
+    ap.add_argument(
+        "--result-cache-mb",
+        type=float,
+        default=DEFAULT_MAX_BYTES / 1024 / 1024,
+        help="Evict least recently used results beyond this size",
+    )
+    ap.add_argument(
+        "--invalidate",
+        default="",
+        help="Drop cached results of these extractors first (comma-separated, or 'all')",
+    )
+    ap.add_argument(
+        "--batch-classify",
+        action="store_true",
+        help="Derive closed_days/accessibility_state/opening_all_year for all "
+        "records at once in DuckDB (classify_batch.py)",
+    )
     args = ap.parse_args()
 
+    cache = None if args.no_cache else HttpCache(args.cache, args.cache_max_age)
+    results_cache = None
+    if not args.no_result_cache:
+        results_cache = ResultCache(
+            args.result_cache, int(args.result_cache_mb * 1024 * 1024)
+        )
+        for name in filter(None, (n.strip() for n in args.invalidate.split(","))):
+            if name != "all" and name not in EXTRACTOR_VERSIONS:
+                ap.error(f"unknown extractor {name!r}")
+            dropped = results_cache.invalidate(None if name == "all" else name)
+            print(f"Invalidated {dropped} cached results ({name})")
+    archive = ArchiveReader(args.archive) if args.archive else None
+
     with open(args.inp, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    out = []
-    for item in tqdm(data, desc="Enriching sections"):
-        out.append(process_item(item, args.delay))
+    workers = max(1, args.workers)
+    rate = args.rate or (1.0 / args.delay if args.delay > 0 else 0.0)
+    limiter = HostRateLimiter(rate, args.burst)
+    session = make_session(workers, args.retries, limiter=limiter)
+
+    def enrich(item):
+        return process_item(
+            item,
+            cache,
+            archive,
+            args.offline,
+            session,
+            results_cache,
+            classify=not args.batch_classify,
+        )
+
+    # map() yields results in input order, whatever order they finish in
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        out = list(
+            tqdm(pool.map(enrich, data), total=len(data), desc="Enriching sections")
+        )
+    session.close()
+    if cache:
+        cache.close()
+    if results_cache:
+        print(
+            f"Extractor results: {results_cache.hits} cached, "
+            f"{results_cache.misses} computed"
+        )
+        results_cache.close()
+
+    if args.batch_classify:
+        from classify_batch import classify_records
+
+        fallback = classify_records(out)
+        print(f"Classified {len(out)} records in DuckDB ({fallback} in Python)")
 
     with open(args.out, "w", encoding="utf-8") as f:
         json.dump(out, f, ensure_ascii=False, indent=2)
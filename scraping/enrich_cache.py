@@ -0,0 +1,153 @@
+"""
+Persistent cache of enrich.py extractor results
+-----------------------------------------------
+enrich.py runs five extractors per page (price, opening_hours, closed_days,
+accessibility, impressions). Their results are stored per (URL, extractor)
+together with the page's normalised body hash and the extractor's version;
+a lookup only hits when both still match, so a changed page or a bumped
+EXTRACTOR_VERSIONS entry in enrich.py recomputes just what is affected. When
+every extractor hits, the page is not even parsed.
+
+The file is kept under `max_bytes` by dropping the least recently used
+results (checked every `evict_every` writes and on close). Hits only note
+their LRU stamp in memory; the stamps are written in the same transaction as
+the next put/eviction/invalidation, so a lookup never leaves a write open.
+
+  cache = ResultCache(".enrich_cache.sqlite", max_bytes=256 * 1024 * 1024)
+  hits = cache.get(url, digest, {"price": 1, "impressions": 2})
+  cache.put(url, digest, {"price": {...}}, versions)
+  cache.invalidate("impressions")      # forget one extractor's results
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_RESULT_CACHE_PATH = ".enrich_cache.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ResultCache:
+    """Extractor results keyed by (url, extractor); safe to share between threads."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_RESULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        evict_every: int = 500,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._touched: dict[tuple[str, str], float] = {}  # pending LRU stamps
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                url       TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                version   INTEGER NOT NULL,
+                body_hash TEXT NOT NULL,
+                value     TEXT NOT NULL,
+                size      INTEGER NOT NULL,
+                used_at   REAL NOT NULL,
+                PRIMARY KEY (url, extractor)
+            )
+            """)
+        self._con.execute(
+            "CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)"
+        )
+        self._con.commit()
+
+    def get(self, url: str, body_hash: str, versions: dict[str, int]) -> dict:
+        """{extractor: result} for every extractor with a current result."""
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT extractor, version, value FROM results "
+                "WHERE url = ? AND body_hash = ?",
+                (url, body_hash),
+            ).fetchall()
+            found = {
+                name: json.loads(value)
+                for name, version, value in rows
+                if versions.get(name) == version
+            }
+            if found:
+                self._touched[url, body_hash] = time.time()
+            self.hits += len(found)
+            self.misses += len(versions) - len(found)
+        return found
+
+    def put(
+        self, url: str, body_hash: str, results: dict, versions: dict[str, int]
+    ) -> None:
+        now = time.time()
+        rows = []
+        for name, result in results.items():
+            value = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+            size = len(url) + len(value) + 100  # rough per-row overhead
+            rows.append((url, name, versions[name], body_hash, value, size, now))
+        with self._lock:
+            self._flush_touched()
+            self._con.executemany(
+                "INSERT OR REPLACE INTO results "
+                "(url, extractor, version, body_hash, value, size, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._con.commit()
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict()
+
+    def _flush_touched(self) -> None:
+        """Write pending LRU stamps; the caller commits (lock held)."""
+        if self._touched:
+            self._con.executemany(
+                "UPDATE results SET used_at = ? WHERE url = ? AND body_hash = ?",
+                [(at, url, h) for (url, h), at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self) -> int:
+        """Drop least recently used rows beyond max_bytes (lock held)."""
+        self._flush_touched()
+        cur = self._con.execute(
+            "DELETE FROM results WHERE rowid IN ("
+            "  SELECT rowid FROM ("
+            "    SELECT rowid, SUM(size) OVER ("
+            "      ORDER BY used_at DESC, rowid DESC) AS kept"
+            "    FROM results)"
+            "  WHERE kept > ?)",
+            (self.max_bytes,),
+        )
+        self._con.commit()
+        return cur.rowcount
+
+    def evict(self) -> int:
+        with self._lock:
+            return self._evict()
+
+    def invalidate(self, extractor: str | None = None) -> int:
+        """Forget the results of one extractor (all results if None)."""
+        with self._lock:
+            self._flush_touched()
+            if extractor is None:
+                cur = self._con.execute("DELETE FROM results")
+            else:
+                cur = self._con.execute(
+                    "DELETE FROM results WHERE extractor = ?", (extractor,)
+                )
+            self._con.commit()
+            return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._evict()
+            self._con.close()
@@ -0,0 +1,162 @@
+"""
+On-disk HTTP response cache with conditional GETs
+-------------------------------------------------
+Shared by scrape_sc.py and enrich.py. Responses are stored per URL in a SQLite
+file (zlib-compressed body + ETag + Last-Modified). Repeat requests send
+If-None-Match / If-Modified-Since, and a 304 is answered from disk, so a
+re-crawl only transfers pages that actually changed.
+
+Both scripts default to the same cache file, so enrich.py revalidates the
+pages scrape_sc.py just downloaded instead of fetching them again.
+
+  cache = HttpCache(".http_cache.sqlite")
+  resp = cached_get(session, url, cache)
+  resp.text, resp.status_code, resp.from_cache
+"""
+
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+DEFAULT_CACHE_PATH = ".http_cache.sqlite"
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    content: bytes
+    encoding: str | None
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = 0.0
+    from_cache: bool = False
+    revalidated: bool = False  # served from disk after a 304
+    elapsed: float = 0.0  # seconds until response headers (0 if not requested)
+    retry_after: str | None = None  # Retry-After header of a 429/503
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class HttpCache:
+    """URL-keyed response store; safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_age: float = 0.0):
+        self.path = path
+        # serve entries younger than max_age seconds without revalidating
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url           TEXT PRIMARY KEY,
+                status        INTEGER NOT NULL,
+                etag          TEXT,
+                last_modified TEXT,
+                encoding      TEXT,
+                body          BLOB NOT NULL,
+                fetched_at    REAL NOT NULL
+            )
+            """)
+        self._con.commit()
+
+    def get(self, url: str) -> CachedResponse | None:
+        with self._lock:
+            row = self._con.execute(
+                "SELECT status, etag, last_modified, encoding, body, fetched_at "
+                "FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        status, etag, last_modified, encoding, body, fetched_at = row
+        return CachedResponse(
+            url=url,
+            status_code=status,
+            content=zlib.decompress(body),
+            encoding=encoding,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=fetched_at,
+            from_cache=True,
+        )
+
+    def put(self, resp: CachedResponse) -> None:
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, status, etag, last_modified, encoding, body, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    resp.url,
+                    resp.status_code,
+                    resp.etag,
+                    resp.last_modified,
+                    resp.encoding,
+                    zlib.compress(resp.content, 6),
+                    resp.fetched_at,
+                ),
+            )
+            self._con.commit()
+
+    def touch(self, url: str, fetched_at: float) -> None:
+        """Mark an entry as revalidated (after a 304)."""
+        with self._lock:
+            self._con.execute(
+                "UPDATE responses SET fetched_at = ? WHERE url = ?", (fetched_at, url)
+            )
+            self._con.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+def cached_get(
+    session, url: str, cache: HttpCache | None, headers: dict | None = None, timeout=25
+) -> CachedResponse:
+    """
+    GET `url` through `cache`. Returns the stored body on a 304 (or while the
+    entry is younger than cache.max_age); stores fresh 2xx responses.
+    `session` is anything with a requests-style .get().
+    """
+    entry = cache.get(url) if cache else None
+    now = time.time()
+    if entry and cache.max_age and now - entry.fetched_at < cache.max_age:
+        return entry
+
+    req_headers = dict(headers or {})
+    if entry:
+        if entry.etag:
+            req_headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            req_headers["If-Modified-Since"] = entry.last_modified
+
+    r = session.get(url, headers=req_headers, timeout=timeout)
+    if r.status_code == 304 and entry:
+        cache.touch(url, now)
+        entry.fetched_at = now
+        entry.revalidated = True
+        entry.elapsed = r.elapsed.total_seconds()
+        return entry
+
+    resp = CachedResponse(
+        url=url,
+        status_code=r.status_code,
+        content=r.content,
+        encoding=r.encoding or r.apparent_encoding,
+        etag=r.headers.get("ETag"),
+        last_modified=r.headers.get("Last-Modified"),
+        fetched_at=now,
+        elapsed=r.elapsed.total_seconds(),
+        retry_after=r.headers.get("Retry-After"),
+    )
+    if cache and 200 <= r.status_code < 300:
+        cache.put(resp)
+    return resp
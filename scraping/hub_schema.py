@@ -0,0 +1,298 @@
+"""
+Declared column types for hub endpoints
+---------------------------------------
+An endpoint in hub_to_duckdb.CONFIG can declare "schema": {column: DuckDB
+type}. Loads then read exactly these columns with these types instead of
+letting read_json_auto sample and infer them on every run, and nested types
+(STRUCT, LIST, MAP) are filled from the JSON the hub sends - also when it
+comes encoded in a string, as addresses/categories/features/media_objects
+do - so queries use native columns instead of from_json()/json_each().
+
+  schema = DeclaredSchema({
+      "id": "VARCHAR",
+      "addresses": "STRUCT(rel VARCHAR, name VARCHAR, email VARCHAR)[]",
+  })
+  files = "'pages/*.jsonl.gz'"
+  con.execute(f"SELECT * FROM {schema.read_sql(files)}")
+  drift = schema.ndjson_drift(con, files)
+  for line in drift.report(schema):
+      print(line)
+
+Undeclared fields and nested keys are not loaded, and values that do not fit
+their type become NULL. A SchemaDrift lists all of that:
+
+  new field 'rating' (not loaded)
+  declared field 'country' not in data
+  addresses[].fax: not in schema
+  addresses: 3 value(s) not convertible to STRUCT(...)[]
+
+JSON columns keep strings as they are (JSON text, as delivered) and store
+other values as their JSON encoding.
+"""
+
+from collections import Counter
+
+import duckdb
+import orjson
+import pyarrow as pa
+
+NESTED = ("struct", "list", "array", "map")
+
+
+def _is_json(dtype) -> bool:
+    return dtype.id == "varchar" and str(dtype) == "JSON"
+
+
+def _sql_str(s: str) -> str:
+    return "'" + s.replace("'", "''") + "'"
+
+
+def _qident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DeclaredSchema:
+    """A CONFIG "schema" resolved through DuckDB (types and Arrow schema)."""
+
+    def __init__(self, columns: dict[str, str]):
+        self.columns = dict(columns)
+        select = ", ".join(
+            f"NULL::{typ} AS {_qident(c)}" for c, typ in self.columns.items()
+        )
+        con = duckdb.connect()
+        try:
+            rel = con.sql(f"SELECT {select} LIMIT 0")
+            self.types = dict(zip(self.columns, rel.types))
+            self.arrow = rel.fetch_arrow_table().schema
+        finally:
+            con.close()
+        # dates and timestamps arrive as ISO strings and are cast by Arrow
+        self.build = pa.schema(
+            pa.field(f.name, pa.string()) if pa.types.is_temporal(f.type) else f
+            for f in self.arrow
+        )
+        self.nested = [c for c, t in self.types.items() if t.id in NESTED]
+        self.json = [c for c, t in self.types.items() if _is_json(t)]
+        self.json_inside = [c for c in self.nested if "JSON" in str(self.types[c])]
+
+    # ---- SQL (NDJSON files) ---
+
+    def typed_sql(self, column: str, raw: str) -> str:
+        """SQL turning `raw` (the field as text) into the declared type."""
+        dtype = self.types[column]
+        typ = self.columns[column]
+        if _is_json(dtype):
+            return f"TRY_CAST({raw} AS JSON)"
+        if dtype.id == "varchar":
+            return raw
+        if dtype.id in NESTED:
+            return f"TRY_CAST(TRY_CAST({raw} AS JSON) AS {typ})"
+        return f"TRY_CAST({raw} AS {typ})"
+
+    def read_sql(self, files_sql: str, filename: bool = False) -> str:
+        """
+        Subquery with the declared columns of NDJSON `files_sql` (a quoted
+        path/glob or a ? parameter); with `filename`, plus _file.
+        """
+        as_text = ", ".join(f"{_sql_str(c)}: 'VARCHAR'" for c in self.columns)
+        select = ", ".join(
+            f"{self.typed_sql(c, _qident(c))} AS {_qident(c)}" for c in self.columns
+        )
+        extra = ", filename = '_file'" if filename else ""
+        return f"""(
+            SELECT {select}{", _file" if filename else ""}
+            FROM read_json({files_sql}, format = 'newline_delimited',
+                           columns = {{{as_text}}}{extra})
+        )"""
+
+    def ndjson_drift(self, con, files_sql: str, params=None) -> "SchemaDrift":
+        """Schema drift of NDJSON `files_sql`, in one pass over the files."""
+        parts = ["count(*)", "json_group_structure(json)"]
+        for c in self.nested:
+            parts.append(
+                f"json_group_structure(TRY_CAST((json->>{_sql_str(c)}) AS JSON))"
+            )
+        for c in self.columns:
+            raw = f"(json->>{_sql_str(c)})"
+            parts.append(
+                f"count(*) FILTER (WHERE {raw} IS NOT NULL "
+                f"AND {self.typed_sql(c, raw)} IS NULL)"
+            )
+        row = con.execute(
+            f"SELECT {', '.join(parts)} "
+            f"FROM read_json_objects({files_sql}, format = 'newline_delimited')",
+            params or [],
+        ).fetchone()
+        drift = SchemaDrift()
+        drift.records = row[0]
+        top = orjson.loads(row[1]) if row[1] else {}
+        drift.keys.update(top if isinstance(top, dict) else ())
+        for c, structure in zip(self.nested, row[2:]):
+            drift.structures[c] = orjson.loads(structure) if structure else None
+        for c, n in zip(self.columns, row[2 + len(self.nested) :]):
+            drift.failures[c] += n
+        return drift
+
+    # ---- Arrow (decoded records) ---
+
+    def to_batch(self, records: list[dict], drift: "SchemaDrift") -> pa.RecordBatch:
+        """Record batch of the declared schema; updates `drift`."""
+        for c in self.nested:
+            for rec in records:
+                v = rec.get(c)
+                if isinstance(v, str):
+                    try:
+                        rec[c] = orjson.loads(v)
+                    except orjson.JSONDecodeError:
+                        rec[c] = None
+                        drift.failures[c] += 1
+        drift.observe(records, self.nested)
+        for c in self.json:
+            for rec in records:
+                v = rec.get(c)
+                if v is not None and not isinstance(v, str):
+                    rec[c] = orjson.dumps(v).decode()
+        for c in self.json_inside:
+            for rec in records:
+                rec[c] = _json_fit(rec.get(c), self.types[c])
+
+        arrays = []
+        for build, declared in zip(self.build, self.arrow):
+            values = [rec.get(build.name) for rec in records]
+            array, bad = _to_array(values, build.type, declared.type)
+            drift.failures[build.name] += bad
+            arrays.append(array)
+        return pa.RecordBatch.from_arrays(arrays, schema=self.arrow)
+
+
+def _json_fit(value, dtype):
+    """Encode the parts of a decoded value that sit at JSON positions."""
+    if value is None:
+        return None
+    if _is_json(dtype):
+        return orjson.dumps(value).decode()
+    if dtype.id in ("list", "array") and isinstance(value, list):
+        child = dtype.children[0][1]
+        return [_json_fit(v, child) for v in value]
+    if dtype.id == "struct" and isinstance(value, dict):
+        fields = dict(dtype.children)
+        return {k: _json_fit(v, fields[k]) for k, v in value.items() if k in fields}
+    if dtype.id == "map" and isinstance(value, dict):
+        child = dict(dtype.children)["value"]
+        return {k: _json_fit(v, child) for k, v in value.items()}
+    return value
+
+
+def _to_array(values: list, build: pa.DataType, declared: pa.DataType):
+    """(array, values that did not fit and became null)."""
+    try:
+        array = pa.array(values, type=build)
+        return (array if build == declared else array.cast(declared)), 0
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    # slow path: find the offending values; strings get a second chance
+    # through Arrow's string cast ("5" -> 5), like TRY_CAST in the SQL path
+    fitted, bad = [], 0
+    for v in values:
+        try:
+            if isinstance(v, str):
+                fitted.append(pa.array([v], type=pa.string()).cast(declared))
+            else:
+                a = pa.array([v], type=build)
+                fitted.append(a if build == declared else a.cast(declared))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            fitted.append(pa.nulls(1, declared))
+            bad += 1
+    return pa.concat_arrays(fitted), bad
+
+
+def merge_structure(acc, value):
+    """Fold `value` into a merged structure like json_group_structure()."""
+    if value is None:
+        return acc
+    if isinstance(value, dict):
+        if acc is None:
+            acc = {}
+        elif not isinstance(acc, dict):
+            return "JSON"
+        for k, v in value.items():
+            acc[k] = merge_structure(acc.get(k), v)
+        return acc
+    if isinstance(value, list):
+        if acc is None:
+            acc = [None]
+        elif not isinstance(acc, list):
+            return "JSON"
+        for v in value:
+            acc[0] = merge_structure(acc[0], v)
+        return acc
+    return "JSON" if isinstance(acc, (dict, list)) else "VALUE"
+
+
+class SchemaDrift:
+    """What the data had that the declared schema did not (and vice versa)."""
+
+    def __init__(self):
+        self.records = 0
+        self.keys: set[str] = set()
+        self.structures: dict = {}
+        self.failures: Counter = Counter()
+
+    def observe(self, records: list[dict], nested: list[str]) -> None:
+        self.records += len(records)
+        for rec in records:
+            self.keys.update(rec)
+        for c in nested:
+            acc = self.structures.get(c)
+            for rec in records:
+                acc = merge_structure(acc, rec.get(c))
+            self.structures[c] = acc
+
+    def report(self, schema: DeclaredSchema) -> list[str]:
+        if not self.records:
+            return []
+        out = [
+            f"new field '{k}' (not loaded)"
+            for k in sorted(self.keys - set(schema.columns))
+        ]
+        out += [
+            f"declared field '{c}' not in data"
+            for c in schema.columns
+            if c not in self.keys
+        ]
+        for c in schema.nested:
+            _unknown_keys(self.structures.get(c), schema.types[c], c, out)
+        out += [
+            f"{c}: {self.failures[c]} value(s) not convertible to {schema.columns[c]}"
+            for c in schema.columns
+            if self.failures[c]
+        ]
+        return out
+
+
+def _unknown_keys(structure, dtype, path: str, out: list[str]) -> None:
+    if isinstance(structure, dict) and dtype.id == "struct":
+        fields = dict(dtype.children)
+        for k, sub in structure.items():
+            if k in fields:
+                _unknown_keys(sub, fields[k], f"{path}.{k}", out)
+            else:
+                out.append(f"{path}.{k}: not in schema")
+    elif isinstance(structure, list) and dtype.id in ("list", "array"):
+        _unknown_keys(structure[0], dtype.children[0][1], f"{path}[]", out)
+
+
+def save_drift(con: duckdb.DuckDBPyConnection, endpoint: str, lines: list[str]):
+    """Keep a run's drift report in the _schema_drift table."""
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS _schema_drift (
+            endpoint   VARCHAR,
+            checked_at TIMESTAMP,
+            message    VARCHAR
+        )
+    """)
+    if lines:
+        con.executemany(
+            "INSERT INTO _schema_drift VALUES (?, now(), ?)",
+            [[endpoint, line] for line in lines],
+        )
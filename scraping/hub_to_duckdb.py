@@ -1,14 +1,29 @@
 # pip install duckdb requests orjson pyarrow tenacity python-dateutil
-import os, pathlib, time, typing as t, duckdb, requests, orjson, re
+import os, pathlib, time, typing as t, duckdb, requests, orjson, re, hashlib
+import argparse, gzip, io, shutil, threading
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from urllib.parse import urlencode, urljoin
+from requests.adapters import HTTPAdapter
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
-    retry_if_exception_type,
+    retry_if_exception,
 )
 
+from hub_schema import DeclaredSchema, SchemaDrift, save_drift
+from json_stream import iter_raw_records
+
+try:
+    import zstandard
+except ImportError:  # only needed for "compression": "zstd"
+    zstandard = None
+
 DATA_DIR = pathlib.Path("data").resolve()
 RAW_DIR = DATA_DIR / "raw_json"
 PARQUET_DIR = DATA_DIR / "parquet"
@@ -30,14 +45,46 @@ CONFIG: list[dict] = [
             },
             # "params": {"page_size": 500},  # optional
             "records_path": ["data"],  # where the list of records lives in the JSON
+            # "stream": True,  # copy records from the response into NDJSON in
+            #                  # chunks instead of decoding whole pages (default;
+            #                  # cursor pagination always decodes the page)
             # "pagination": {  # choose ONE strategy below
             #     "type": "page",  # "page" OR "cursor" OR "none"
             #     "page_param": "page",  # ?page=1,2,3,...
             #     "start": 1,
             #     "stop_when_empty": True,  # stop when a page returns zero records
+            #     "prefetch": 4,  # pages kept in flight (written in order)
             # },
         },
         "write_parquet": True,  # also emit a parquet snapshot
+        # "compression": "gzip",  # raw files: "gzip" (default), "zstd" (needs
+        #                         # `pip install zstandard`) or "none"
+        # "keep_runs": 1,  # committed raw runs kept per endpoint
+        # "load": {
+        #     "mode": "incremental",  # "replace" (default) rebuilds the table
+        #     #   from the raw NDJSON; "arrow" rebuilds it from Arrow batches
+        #     #   (needs "schema", writes no raw files)
+        #     "key": "id",  # upsert key of the hub records
+        #     "updated_field": "lastModified",  # optional: high-water mark
+        #     "since_param": "modifiedSince",  # optional: fetch only records
+        #     #   changed since the high-water mark (no soft deletes then)
+        #     "full_sync_hours": 24,  # with since_param: fetch everything (and
+        #     #   soft-delete what is gone) when the last full sync is older;
+        #     #   `--full` forces it
+        # },
+        # "schema": {  # DuckDB column types, see hub_schema.py; other fields
+        #     #   are dropped and reported as schema drift after each load
+        #     "id": "VARCHAR",
+        #     "title": "VARCHAR",
+        #     "city": "VARCHAR",
+        #     "country": "VARCHAR",
+        #     # JSON-in-string fields, expanded into native columns
+        #     "addresses": "STRUCT(rel VARCHAR, name VARCHAR, email VARCHAR,"
+        #                  " phone VARCHAR)[]",
+        #     "categories": "JSON[]",
+        #     "features": "JSON[]",
+        #     "media_objects": "JSON[]",
+        # },
     },
 ]
 # ======================================================
@@ -45,6 +92,14 @@ CONFIG: list[dict] = [
 Json = dict | list | str | int | float | bool | None
 
 
+def qident(name: str) -> str:
+    return (
+        name
+        if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name)
+        else '"' + name.replace('"', '""') + '"'
+    )
+
+
 def get_in(d: Json, path: list[str | int]) -> t.Any:
     """Safe nested lookup: path like ['data','items'] or ['results',0,'id']."""
     cur: t.Any = d
@@ -62,18 +117,155 @@ def get_in(d: Json, path: list[str | int]) -> t.Any:
     return cur
 
 
-@retry(
+class RetryableStatus(requests.HTTPError):
+    """429 or 5xx: worth another try, unlike other 4xx responses."""
+
+
+class PagerClosed(Exception):
+    """The page prefetcher was closed while this request waited to retry."""
+
+
+# set by iter_pages in its worker threads, so retries stop when it closes
+_pager = threading.local()
+
+
+def _pager_closed() -> bool:
+    cancel = getattr(_pager, "cancel", None)
+    return cancel is not None and cancel.is_set()
+
+
+def _retryable(exc: BaseException) -> bool:
+    if _pager_closed():
+        return False
+    return isinstance(
+        exc,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+            RetryableStatus,
+        ),
+    )
+
+
+def _before_attempt(state) -> None:
+    if state.attempt_number > 1 and _pager_closed():
+        raise PagerClosed()
+
+
+def _retry_sleep(seconds: float) -> None:
+    cancel = getattr(_pager, "cancel", None)
+    if cancel is None:
+        time.sleep(seconds)
+    else:
+        cancel.wait(seconds)
+
+
+# connection errors, timeouts, 429 and 5xx; other 4xx fail at once
+http_retry = retry(
     stop=stop_after_attempt(5),
     wait=wait_exponential(multiplier=1, min=1, max=20),
-    retry=retry_if_exception_type((requests.RequestException,)),
+    retry=retry_if_exception(_retryable),
+    before=_before_attempt,
+    sleep=_retry_sleep,
 )
-def http_get(url: str, headers: dict, timeout: int = 60) -> requests.Response:
-    r = requests.get(url, headers=headers, timeout=timeout)
+
+
+def raise_for_status(r: requests.Response, url: str) -> None:
+    if r.status_code == 429 or r.status_code >= 500:
+        raise RetryableStatus(f"{r.status_code} for {url}\n{r.text[:500]}")
     if r.status_code >= 400:
         raise requests.HTTPError(f"{r.status_code} for {url}\n{r.text[:500]}")
+
+
+@http_retry
+def http_get(
+    url: str,
+    headers: dict,
+    timeout: int = 60,
+    session: requests.Session | None = None,
+) -> requests.Response:
+    r = (session or requests).get(url, headers=headers, timeout=timeout)
+    raise_for_status(r, url)
     return r
 
 
+def make_session(pool_size: int = 4) -> requests.Session:
+    """Keep-alive session with room for `pool_size` parallel requests per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_records(
+    session: requests.Session, url: str, headers: dict, rec_path: list
+) -> tuple[list, t.Any]:
+    """(records, payload) of one page; records is [] if not a list."""
+    payload = orjson.loads(http_get(url, headers=headers, session=session).content)
+    records = get_in(payload, rec_path) if rec_path else payload
+    return (records if isinstance(records, list) else []), payload
+
+
+@http_retry
+def stream_records_to_jsonl(
+    session: requests.Session,
+    url: str,
+    headers: dict,
+    rec_path: list,
+    path: pathlib.Path,
+    wrap_object: bool = False,
+) -> int:
+    """
+    Copy the records at `rec_path` of one response into `path` as NDJSON while
+    the body is downloaded; the page is never held or decoded as a whole.
+    Returns the number of records written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with session.get(url, headers=headers, timeout=60, stream=True) as r:
+        raise_for_status(r, url)
+        n = 0
+        with open_raw(path, "wb") as f:
+            for raw in iter_raw_records(r.iter_content(1 << 16), rec_path, wrap_object):
+                f.write(raw)
+                f.write(b"\n")
+                n += 1
+    return n
+
+
+def iter_pages(fetch: t.Callable[[int], list], start: int, window: int):
+    """
+    Yield (page, records) for start, start+1, ... in order while keeping up to
+    `window` pages in flight. Stop by closing the generator (or breaking out
+    of the loop): pages not started yet are cancelled, pages already running
+    finish their current request without retrying (http_retry), and results
+    past the stopping point, including errors, are dropped.
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, window))
+    cancel = threading.Event()
+    inflight: deque = deque()
+    next_page = start
+
+    def run(page: int):
+        _pager.cancel = cancel
+        try:
+            return fetch(page)
+        finally:
+            _pager.cancel = None
+
+    try:
+        while True:
+            while len(inflight) < max(1, window):
+                inflight.append((next_page, pool.submit(run, next_page)))
+                next_page += 1
+            page, fut = inflight.popleft()
+            yield page, fut.result()
+    finally:
+        cancel.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
 def make_page_url(base_url: str, params: dict, page_param: str, page: int) -> str:
     qp = params.copy()
     qp[page_param] = page
@@ -91,24 +283,91 @@ def make_cursor_url(
     return f"{base_url}{sep}{urlencode(qp)}" if qp else base_url
 
 
+# ---- raw store ---
+# Every ingest writes its page files into data/raw_json/<name>/runs/<id>.tmp/
+# and renames the directory to runs/<id>/ once all pages are there; CURRENT
+# holds the id of the newest committed run. A failed or repeated run never
+# mixes with or duplicates committed data, and readers only see whole runs.
+# Files are gzip/zstd-compressed NDJSON, which DuckDB reads directly.
+# `python hub_to_duckdb.py compact` merges a run's page files into a few
+# large segments. One ingest/compaction per endpoint at a time.
+
+RAW_SUFFIX = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst", "none": ".jsonl"}
+
+
+def open_raw(path: pathlib.Path, mode: str = "rb") -> t.BinaryIO:
+    """Open a raw NDJSON file, (de)compressing by its suffix (.part ignored)."""
+    name = path.name.removesuffix(".part")
+    if name.endswith(".gz"):
+        # mtime=0 keeps equal pages byte-identical (see file_digest)
+        return gzip.GzipFile(path, mode, compresslevel=6, mtime=0)
+    if name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path}: zstd files need `pip install zstandard`")
+        if "r" in mode:
+            return io.BufferedReader(zstandard.open(path, mode))
+        return zstandard.open(path, mode, cctx=zstandard.ZstdCompressor(level=3))
+    return open(path, mode)
+
+
+def runs_dir(ep_name: str) -> pathlib.Path:
+    return RAW_DIR / ep_name / "runs"
+
+
+def begin_run(ep_name: str) -> pathlib.Path:
+    """Empty directory for a new run; leftovers of failed runs are removed."""
+    runs = runs_dir(ep_name)
+    runs.mkdir(parents=True, exist_ok=True)
+    for stale in runs.glob("*.tmp"):
+        shutil.rmtree(stale)
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    tmp = runs / f"{run_id}.tmp"
+    tmp.mkdir()
+    return tmp
+
+
+def commit_run(tmp: pathlib.Path, keep_runs: int = 1) -> pathlib.Path:
+    """Publish a finished run directory and drop all but the newest runs."""
+    run = tmp.with_suffix("")
+    os.replace(tmp, run)
+    current = run.parent.parent / "CURRENT"
+    part = current.with_name("CURRENT.part")
+    part.write_text(run.name)
+    os.replace(part, current)
+    committed = sorted(p for p in run.parent.iterdir() if p.suffix != ".tmp")
+    for old in committed[: -max(1, keep_runs)]:
+        shutil.rmtree(old)
+    return run
+
+
+def current_run(ep_name: str) -> pathlib.Path | None:
+    current = RAW_DIR / ep_name / "CURRENT"
+    if not current.exists():
+        return None
+    run = runs_dir(ep_name) / current.read_text().strip()
+    return run if run.is_dir() else None
+
+
+def run_files(run: pathlib.Path) -> list[pathlib.Path]:
+    return sorted(
+        p for p in run.iterdir() if ".jsonl" in p.name and p.suffix != ".part"
+    )
+
+
 def write_jsonl(path: pathlib.Path, records: list[dict]) -> int:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "ab") as f:
+    with open_raw(path, "wb") as f:
         for rec in records:
             f.write(orjson.dumps(rec))
             f.write(b"\n")
     return len(records)
 
 
-def stream_endpoint_to_ndjson(ep_name: str, api_cfg: dict) -> list[pathlib.Path]:
+def iter_record_pages(api_cfg: dict, session: requests.Session):
     """
-    Streams all pages/cursors to NDJSON files under data/raw_json/<ep_name>/page_*.jsonl
-    Returns list of created file paths.
+    Yield (page number, decoded records) for every page of an endpoint, in
+    order, for all three pagination types.
     """
-    out_dir = RAW_DIR / ep_name
-    out_dir.mkdir(parents=True, exist_ok=True)
-    created: list[pathlib.Path] = []
-
     base_url: str = api_cfg["base_url"]
     headers: dict = api_cfg.get("headers", {})
     params: dict = api_cfg.get("params", {})
@@ -118,22 +377,21 @@ def stream_endpoint_to_ndjson(ep_name: str, api_cfg: dict) -> list[pathlib.Path]
     typ = pg.get("type", "none")
 
     if typ == "page":
-        page = int(pg.get("start", 1))
         page_param = pg["page_param"]
         stop_when_empty = bool(pg.get("stop_when_empty", True))
-        while True:
+
+        def fetch(page: int) -> list:
             url = make_page_url(base_url, params, page_param, page)
-            resp = http_get(url, headers=headers)
-            payload = resp.json()
-            records = get_in(payload, rec_path) if rec_path else payload
-            if not isinstance(records, list):
-                records = []
-            if stop_when_empty and len(records) == 0:
-                break
-            file = out_dir / f"page_{page:06d}.jsonl"
-            write_jsonl(file, records)
-            created.append(file)
-            page += 1
+            return fetch_records(session, url, headers, rec_path)[0]
+
+        pages = iter_pages(fetch, int(pg.get("start", 1)), int(pg.get("prefetch", 4)))
+        try:
+            for page, records in pages:
+                if stop_when_empty and len(records) == 0:
+                    break
+                yield page, records
+        finally:
+            pages.close()
 
     elif typ == "cursor":
         cursor_param = pg["cursor_param"]
@@ -142,14 +400,10 @@ def stream_endpoint_to_ndjson(ep_name: str, api_cfg: dict) -> list[pathlib.Path]
         page = 1
         while True:
             url = make_cursor_url(base_url, params, cursor_param, cursor)
-            resp = http_get(url, headers=headers)
-            payload = resp.json()
-            records = get_in(payload, rec_path) if rec_path else payload
-            if not isinstance(records, list) or len(records) == 0:
+            records, payload = fetch_records(session, url, headers, rec_path)
+            if len(records) == 0:
                 break
-            file = out_dir / f"page_{page:06d}.jsonl"
-            write_jsonl(file, records)
-            created.append(file)
+            yield page, records
 
             # move cursor forward; stop if missing
             cursor = get_in(payload, cursor_path)
@@ -159,26 +413,389 @@ def stream_endpoint_to_ndjson(ep_name: str, api_cfg: dict) -> list[pathlib.Path]
 
     else:  # "none" -> single call
         url = make_cursor_url(base_url, params, cursor_param="", cursor=None)
-        resp = http_get(url, headers=headers)
-        payload = resp.json()
+        resp = http_get(url, headers=headers, session=session)
+        payload = orjson.loads(resp.content)
         records = get_in(payload, rec_path) if rec_path else payload
         if not isinstance(records, list):
             # allow a single object; wrap it
             records = [records] if isinstance(records, dict) else []
-        file = out_dir / "page_000001.jsonl"
-        write_jsonl(file, records)
+        yield 1, records
+
+
+def stream_endpoint_to_ndjson(
+    ep_name: str,
+    api_cfg: dict,
+    out_dir: pathlib.Path | None = None,
+    suffix: str = ".jsonl",
+) -> list[pathlib.Path]:
+    """
+    Streams all pages/cursors to NDJSON files <out_dir>/page_*<suffix>
+    (default data/raw_json/<ep_name>/; the suffix picks the compression).
+    Returns list of created file paths.
+    """
+    out_dir = out_dir or RAW_DIR / ep_name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    created: list[pathlib.Path] = []
+
+    base_url: str = api_cfg["base_url"]
+    headers: dict = api_cfg.get("headers", {})
+    params: dict = api_cfg.get("params", {})
+    rec_path: list = api_cfg.get("records_path", [])
+    pg = api_cfg.get("pagination", {"type": "none"})
+
+    typ = pg.get("type", "none")
+    # cursor pagination needs the decoded page for the next cursor
+    stream = bool(api_cfg.get("stream", True)) and typ != "cursor"
+
+    session = make_session(int(pg.get("prefetch", 4)))
+
+    if stream and typ == "page":
+        page_param = pg["page_param"]
+        stop_when_empty = bool(pg.get("stop_when_empty", True))
+
+        def fetch(page: int) -> int:
+            # written by the worker; renamed in page order below
+            url = make_page_url(base_url, params, page_param, page)
+            part = out_dir / f"page_{page:06d}{suffix}.part"
+            return stream_records_to_jsonl(session, url, headers, rec_path, part)
+
+        pages = iter_pages(fetch, int(pg.get("start", 1)), int(pg.get("prefetch", 4)))
+        try:
+            for page, count in pages:
+                if stop_when_empty and count == 0:
+                    break
+                file = out_dir / f"page_{page:06d}{suffix}"
+                os.replace(file.with_name(file.name + ".part"), file)
+                created.append(file)
+        finally:
+            pages.close()
+            for part in out_dir.glob("*.part"):
+                part.unlink()
+
+    elif stream:  # "none" -> single call
+        url = make_cursor_url(base_url, params, cursor_param="", cursor=None)
+        file = out_dir / f"page_000001{suffix}"
+        # a single object becomes one record, as when decoding
+        part = file.with_name(file.name + ".part")
+        stream_records_to_jsonl(session, url, headers, rec_path, part, True)
+        os.replace(part, file)
         created.append(file)
 
+    else:
+        for page, records in iter_record_pages(api_cfg, session):
+            file = out_dir / f"page_{page:06d}{suffix}"
+            write_jsonl(file, records)
+            created.append(file)
+
+    session.close()
     return created
 
 
-def load_ndjson_to_duckdb(db_path: str, table: str, files_glob: str):
+def load_ndjson_to_duckdb(
+    db_path: str, table: str, files_glob: str, schema: DeclaredSchema | None = None
+) -> list[str]:
+    """Rebuild `table` from the files; returns the schema drift report."""
+    source = f"read_json_auto('{files_glob}')"
+    if schema:
+        source = schema.read_sql(f"'{files_glob}'")
     con = duckdb.connect(db_path)
-    con.execute(f"""
-        CREATE OR REPLACE TABLE {duckdb.escape_identifier(table)} AS
-        SELECT * FROM read_json_auto('{files_glob}');
+    try:
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {qident(table)} AS
+            SELECT * FROM {source};
+        """)
+        if schema:
+            return schema.ndjson_drift(con, f"'{files_glob}'").report(schema)
+        return []
+    finally:
+        con.close()
+
+
+# ---- incremental load ---
+# Target rows carry _hash (md5 of the record), _file (name of the page file it
+# came from), _loaded_at and _deleted_at. Per endpoint, _ingest_files
+# remembers the digest of every page file name already loaded and
+# _ingest_state the high-water mark, so a run only stages the page files
+# whose content changed since the previous run.
+
+META_COLUMNS = {
+    "_hash": "VARCHAR",
+    "_file": "VARCHAR",
+    "_loaded_at": "TIMESTAMP",
+    "_deleted_at": "TIMESTAMP",
+}
+
+
+def file_digest(path: pathlib.Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _ensure_state_tables(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS _ingest_files (
+            endpoint  VARCHAR,
+            file      VARCHAR,
+            digest    VARCHAR,
+            loaded_at TIMESTAMP,
+            PRIMARY KEY (endpoint, file)
+        )
     """)
-    con.close()
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS _ingest_state (
+            endpoint       VARCHAR PRIMARY KEY,
+            high_water     VARCHAR,
+            last_sync      TIMESTAMP,
+            last_full_sync TIMESTAMP
+        )
+    """)
+
+
+def read_sync_state(db_path: str, ep_name: str) -> tuple[str | None, float | None]:
+    """(high-water mark, hours since the last full sync) of an endpoint."""
+    con = duckdb.connect(db_path)
+    try:
+        _ensure_state_tables(con)
+        row = con.execute(
+            """
+            SELECT high_water,
+                   epoch(now()::TIMESTAMP - last_full_sync) / 3600
+            FROM _ingest_state WHERE endpoint = ?
+            """,
+            [ep_name],
+        ).fetchone()
+    finally:
+        con.close()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def _columns(con: duckdb.DuckDBPyConnection, table: str) -> dict[str, str]:
+    rows = con.execute(f"DESCRIBE {table}").fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+def load_ndjson_incremental(
+    db_path: str,
+    table: str,
+    ep_name: str,
+    files: list[pathlib.Path],
+    key: str = "id",
+    updated_field: str | None = None,
+    full: bool = True,
+    schema: DeclaredSchema | None = None,
+) -> dict:
+    """
+    Upsert the records of the page files that changed since the last load
+    into `table` by `key`. Rows are only rewritten when their hash, page file
+    or deletion state changed. With `full` (the run fetched the whole
+    endpoint), rows of changed pages that are gone and rows of pages that no
+    longer exist get _deleted_at; a record that comes back is undeleted.
+
+    A partial run (only records changed since the high-water mark) stages
+    all its files and keeps the rows' _file: its pages are not the pages of
+    a full fetch. It forgets the file digests, so the next full run restages
+    every file and the deletion pass sees the whole endpoint again.
+
+    Columns new in the staged files are added to the table; existing columns
+    keep the type of the first load (nested fields are cast by name). With a
+    declared `schema` the staged files are read with it instead.
+    Returns counts of staged files and new / changed / deleted rows, and the
+    schema drift report of the staged files ("drift").
+    """
+    q = qident
+    tbl, k = q(table), q(key)
+    paths = {f.name: f.resolve().as_posix() for f in files}
+    digests = {name: file_digest(f) for name, f in zip(paths, files)}
+
+    con = duckdb.connect(db_path)
+    _ensure_state_tables(con)
+    known = dict(
+        con.execute(
+            "SELECT file, digest FROM _ingest_files WHERE endpoint = ?", [ep_name]
+        ).fetchall()
+    )
+    exists = table in {r[0] for r in con.execute("SHOW TABLES").fetchall()}
+    changed = [n for n in paths if not (exists and full) or known.get(n) != digests[n]]
+    stats = {"files": len(changed), "new": 0, "changed": 0, "deleted": 0}
+    stats["drift"] = []
+    high_water = None
+
+    con.begin()
+    try:
+        if changed:
+            # one row per key. The hash leaves out the page file and null
+            # fields (merge-patching into {} drops them), so columns that only
+            # other files have do not change it.
+            record = """json_merge_patch('{}', to_json(s), '{"_file": null}')"""
+            source = "read_json_auto(?, filename = '_file')"
+            if schema:
+                source = schema.read_sql("?", filename=True)
+            con.execute(
+                f"""
+                CREATE OR REPLACE TEMP TABLE _stage AS
+                SELECT * REPLACE (parse_filename(_file) AS _file),
+                       md5({record}::VARCHAR) AS _hash
+                FROM {source} s
+                QUALIFY row_number() OVER (PARTITION BY {k} ORDER BY _file DESC) = 1
+                """,
+                [[paths[n] for n in changed]],
+            )
+            stage_cols = _columns(con, "_stage")
+            if schema:
+                staged = [[paths[n] for n in changed]]
+                stats["drift"] = schema.ndjson_drift(con, "?", staged).report(schema)
+            if updated_field:
+                high_water = con.execute(
+                    f"SELECT max({q(updated_field)})::VARCHAR FROM _stage"
+                ).fetchone()[0]
+
+            if not exists:
+                con.execute(f"""
+                    CREATE TABLE {tbl} AS
+                    SELECT * FROM _stage WHERE false
+                """)
+            cols = _columns(con, table)
+            for name, typ in {**stage_cols, **META_COLUMNS}.items():
+                if name not in cols:
+                    con.execute(f"ALTER TABLE {tbl} ADD COLUMN {q(name)} {typ}")
+
+            stats["new"], stats["changed"] = con.execute(f"""
+                SELECT count(*) FILTER (WHERE t.{k} IS NULL),
+                       count(*) FILTER (WHERE t.{k} IS NOT NULL AND (
+                           t._hash IS DISTINCT FROM s._hash
+                           OR t._deleted_at IS NOT NULL))
+                FROM _stage s LEFT JOIN {tbl} t ON t.{k} = s.{k}
+            """).fetchone()
+
+            names = [q(c) for c in stage_cols]
+            values = [f"s.{c}" for c in names]
+            moved = "OR t._file IS DISTINCT FROM s._file"
+            if not full:
+                # rows keep the page of the last full run (new rows: none)
+                names.remove(q("_file"))
+                values.remove("s._file")
+                moved = ""
+            con.execute(f"""
+                MERGE INTO {tbl} t USING _stage s ON t.{k} = s.{k}
+                WHEN MATCHED AND (t._hash IS DISTINCT FROM s._hash
+                                  {moved}
+                                  OR t._deleted_at IS NOT NULL) THEN
+                    UPDATE SET {", ".join(f"{c} = s.{c}" for c in names)},
+                               _loaded_at = now(), _deleted_at = NULL
+                WHEN NOT MATCHED THEN
+                    INSERT ({", ".join(names)}, _loaded_at)
+                    VALUES ({", ".join(values)}, now())
+            """)
+
+        if full:
+            # gone: pages that were not fetched this time, and keys missing
+            # from the pages that were restaged
+            gone = "coalesce(_file, '') NOT IN (SELECT unnest(?::VARCHAR[]))"
+            if changed:
+                gone += (
+                    " OR (_file IN (SELECT unnest(?::VARCHAR[]))"
+                    f" AND {k} NOT IN (SELECT {k} FROM _stage))"
+                )
+            stats["deleted"] = con.execute(
+                f"UPDATE {tbl} SET _deleted_at = now() "
+                f"WHERE _deleted_at IS NULL AND ({gone})",
+                [list(paths), changed] if changed else [list(paths)],
+            ).fetchone()[0]
+
+        if not full:
+            con.execute("DELETE FROM _ingest_files WHERE endpoint = ?", [ep_name])
+        elif changed:
+            con.executemany(
+                "INSERT OR REPLACE INTO _ingest_files VALUES (?, ?, ?, now())",
+                [[ep_name, n, digests[n]] for n in changed],
+            )
+        con.execute(
+            """
+            INSERT INTO _ingest_state VALUES (?, ?, now(), CASE WHEN ? THEN now() END)
+            ON CONFLICT (endpoint) DO UPDATE SET
+                high_water = greatest(_ingest_state.high_water,
+                                      excluded.high_water),
+                last_sync = excluded.last_sync,
+                last_full_sync = coalesce(excluded.last_full_sync,
+                                          _ingest_state.last_full_sync)
+            """,
+            [ep_name, high_water, full],
+        )
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        con.close()
+    return stats
+
+
+# ---- arrow load ---
+# The decoded records of each page become one Arrow record batch of the
+# declared schema. DuckDB scans the batch stream in place (no NDJSON files,
+# no second JSON parse) while the same batches go to the Parquet snapshot.
+
+
+def load_arrow(
+    cfg: dict, api_cfg: dict, schema: DeclaredSchema
+) -> tuple[int, str | None, list[str]]:
+    """
+    Fetch every page and stream it as an Arrow batch into the table, and into
+    the Parquet snapshot when write_parquet is set, in a single pass.
+    Returns (rows, parquet path or None, schema drift report).
+    """
+    name, table = cfg["name"], cfg["table"]
+    drift = SchemaDrift()
+
+    parquet_path = None
+    writer = None
+    if cfg.get("write_parquet", False):
+        out_dir = PARQUET_DIR / name
+        out_dir.mkdir(parents=True, exist_ok=True)
+        parquet_path = str(out_dir / f"{table}.parquet")
+        writer = pq.ParquetWriter(parquet_path + ".part", schema.arrow)
+
+    pg = api_cfg.get("pagination", {})
+    session = make_session(int(pg.get("prefetch", 4)))
+    rows = 0
+
+    def batches():
+        nonlocal rows
+        for page, records in iter_record_pages(api_cfg, session):
+            if not records:
+                continue
+            batch = schema.to_batch(records, drift)
+            if writer is not None:
+                writer.write_batch(batch)
+            rows += batch.num_rows
+            yield batch
+
+    select = ", ".join(
+        f"CAST({qident(c)} AS {typ}) AS {qident(c)}"
+        for c, typ in schema.columns.items()
+    )
+    con = duckdb.connect(cfg["db_path"])
+    try:
+        reader = pa.RecordBatchReader.from_batches(schema.arrow, batches())
+        con.register("_batches", reader)
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {qident(table)} AS
+            SELECT {select} FROM _batches
+        """)
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(parquet_path + ".part", parquet_path)
+    finally:
+        con.close()
+        session.close()
+        if writer is not None:
+            writer.close()
+            os.remove(parquet_path + ".part")
+    return rows, parquet_path, drift.report(schema)
 
 
 def write_parquet_snapshot(db_path: str, table: str, ep_name: str):
@@ -187,35 +804,172 @@ def write_parquet_snapshot(db_path: str, table: str, ep_name: str):
     parquet_path = str(out_dir / f"{table}.parquet")
     con = duckdb.connect(db_path)
     con.execute(
-        f"COPY (SELECT * FROM {duckdb.escape_identifier(table)}) TO '{parquet_path}' (FORMAT PARQUET);"
+        f"COPY (SELECT * FROM {qident(table)}) TO '{parquet_path}' (FORMAT PARQUET);"
     )
     con.close()
     return parquet_path
 
 
-def ingest_endpoint(cfg: dict):
+def report_drift(db_path: str, ep_name: str, lines: list[str]) -> None:
+    """Print a load's schema drift and keep it in the _schema_drift table."""
+    for line in lines:
+        print(f"{ep_name}: schema drift: {line}")
+    con = duckdb.connect(db_path)
+    try:
+        save_drift(con, ep_name, lines)
+    finally:
+        con.close()
+
+
+def ingest_endpoint(cfg: dict, full_sync: bool = False):
     name = cfg["name"]
     db_path = cfg["db_path"]
     table = cfg["table"]
     api_cfg = cfg["api"]
+    load = cfg.get("load", {})
+    schema = DeclaredSchema(cfg["schema"]) if cfg.get("schema") else None
+    if load.get("mode") == "arrow":
+        if schema is None:
+            raise SystemExit(f'{name}: "load": {{"mode": "arrow"}} needs a "schema"')
+        print(f"\n=== {name}: fetching into DuckDB -> {db_path} table {table} ===")
+        rows, pq_path, drift = load_arrow(cfg, api_cfg, schema)
+        print(f"{name}: {rows} rows loaded from Arrow batches.")
+        report_drift(db_path, name, drift)
+        if pq_path:
+            print(f"{name}: parquet snapshot -> {pq_path}")
+        print(f"{name}: done.")
+        return
+    incremental = load.get("mode", "replace") == "incremental"
+    full = True
+    if incremental and load.get("since_param") and not full_sync:
+        high_water, hours = read_sync_state(db_path, name)
+        if high_water and hours is not None and hours < load.get("full_sync_hours", 24):
+            # only changed records are fetched, so nothing can be soft-deleted
+            # until the next full sync
+            params = {**api_cfg.get("params", {}), load["since_param"]: high_water}
+            api_cfg = {**api_cfg, "params": params}
+            full = False
     print(f"\n=== {name}: fetching ===")
-    files = stream_endpoint_to_ndjson(name, api_cfg)
+    suffix = RAW_SUFFIX[cfg.get("compression", "gzip")]
+    tmp = begin_run(name)
+    try:
+        files = stream_endpoint_to_ndjson(name, api_cfg, tmp, suffix)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
     if not files:
+        shutil.rmtree(tmp)
         print(f"{name}: No data files created; skipping DuckDB load.")
         return
-    print(f"{name}: {len(files)} jsonl files created.")
-    glob = str((RAW_DIR / name / "*.jsonl").as_posix())
+    run = commit_run(tmp, int(cfg.get("keep_runs", 1)))
+    files = [run / f.name for f in files]
+    print(f"{name}: {len(files)} jsonl files created in {run}.")
     print(f"{name}: loading into DuckDB -> {db_path} table {table}")
-    load_ndjson_to_duckdb(db_path, table, glob)
+    if incremental:
+        stats = load_ndjson_incremental(
+            db_path,
+            table,
+            name,
+            files,
+            key=load.get("key", "id"),
+            updated_field=load.get("updated_field"),
+            full=full,
+            schema=schema,
+        )
+        print(
+            f"{name}: {stats['files']} changed files, {stats['new']} new, "
+            f"{stats['changed']} changed, {stats['deleted']} deleted"
+        )
+        drift = stats["drift"]
+    else:
+        glob = str((run / f"*{suffix}").as_posix())
+        drift = load_ndjson_to_duckdb(db_path, table, glob, schema)
+    if schema:
+        report_drift(db_path, name, drift)
     if cfg.get("write_parquet", False):
         pq = write_parquet_snapshot(db_path, table, name)
         print(f"{name}: parquet snapshot -> {pq}")
     print(f"{name}: done.")
 
 
+def compact_endpoint(cfg: dict, segment_mb: int = 256) -> pathlib.Path | None:
+    """
+    Rewrite the current run of an endpoint as segment_*.jsonl.* files of about
+    `segment_mb` MB of NDJSON each, committed as a new run.
+    """
+    name = cfg["name"]
+    run = current_run(name)
+    files = run_files(run) if run else []
+    if len(files) <= 1:
+        print(f"{name}: nothing to compact.")
+        return run
+    suffix = RAW_SUFFIX[cfg.get("compression", "gzip")]
+    limit = segment_mb << 20
+    tmp = begin_run(name)
+    out, size, segments = None, 0, 0
+    try:
+        for src in files:
+            with open_raw(src, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    if out is None or size >= limit:
+                        if out is not None:
+                            out.close()
+                        segments += 1
+                        out = open_raw(tmp / f"segment_{segments:06d}{suffix}", "wb")
+                        size = 0
+                    out.write(line if line.endswith(b"\n") else line + b"\n")
+                    size += len(line)
+        if out is not None:
+            out.close()
+    except BaseException:
+        if out is not None:
+            out.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    before = sum(p.stat().st_size for p in files)
+    new_run = commit_run(tmp, int(cfg.get("keep_runs", 1)))
+    after = sum(p.stat().st_size for p in run_files(new_run))
+    print(
+        f"{name}: {len(files)} files ({before / 1e6:.1f} MB) -> {segments} "
+        f"segments ({after / 1e6:.1f} MB) in {new_run}"
+    )
+    return new_run
+
+
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "command",
+        nargs="?",
+        default="ingest",
+        choices=["ingest", "compact"],
+        help="ingest (default): fetch and load; compact: merge raw page files",
+    )
+    ap.add_argument(
+        "--endpoint", action="append", help="only this endpoint (repeatable)"
+    )
+    ap.add_argument(
+        "--segment-mb",
+        type=int,
+        default=256,
+        help="uncompressed NDJSON per compacted segment",
+    )
+    ap.add_argument(
+        "--full",
+        action="store_true",
+        help="ingest: fetch all records, also where a since_param is set",
+    )
+    args = ap.parse_args()
+
     for endpoint_cfg in CONFIG:
-        ingest_endpoint(endpoint_cfg)
+        if args.endpoint and endpoint_cfg["name"] not in args.endpoint:
+            continue
+        if args.command == "compact":
+            compact_endpoint(endpoint_cfg, args.segment_mb)
+        else:
+            ingest_endpoint(endpoint_cfg, full_sync=args.full)
 
 
 if __name__ == "__main__":
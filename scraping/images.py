@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Local image pipeline for enriched POIs
+--------------------------------------
+enrich.py keeps every srcset variant of a gallery image in `impressions`, and
+the web gallery used to load those slider-size images straight from
+salzburg.info. This stage runs over enrich.py's output and:
+
+1. groups the variants of one asset (Pimcore "image-thumb__<id>__<config>"
+   URLs, "@2x" suffixes, "-800x600" / ?w= size hints) and picks the largest,
+2. downloads each asset once into a content-addressed store (the URL -> sha256
+   mapping is kept, so re-runs download nothing new),
+3. renders a cropped thumbnail and width-limited WebP versions of every asset
+   in a process pool (existing files are kept),
+4. writes the records back with one URL per asset in `impressions` and the
+   local files in `impressions_local`.
+
+Store layout:
+  objects/ab/<sha256>.<ext>             original bytes
+  derived/ab/<sha256>-400x300.webp      thumbnail (cropped to fill)
+  derived/ab/<sha256>-800w.webp ...     one WebP per --widths entry
+  sources.sqlite                        url -> sha256, width, height
+
+USAGE
+  pip install requests Pillow tqdm
+  python images.py --in enriched.json --out enriched_images.json \
+      --store .image_store --public-url /images
+
+Options
+  --store       Image store directory [default .image_store]
+  --public-url  Prefix for local paths in the output (e.g. where the web app
+                serves --store from) [default: the --store path]
+  --thumb       Thumbnail size WxH, cropped to fill [default 400x300]
+  --widths      WebP widths, comma-separated; widths above the original are
+                skipped, the original size is always rendered [default 800,1600]
+  --quality     WebP quality [default 80]
+  --delay / --rate / --burst  Per-host download rate limit, as in enrich.py
+  --workers     Concurrent downloads [default 8]
+  --procs       Render processes [default: CPU count]
+  --retries     Retries per image after 429/5xx or connection errors [default 3]
+
+OUTPUT (per record, in addition to the input fields)
+  impressions:        [string]            one (largest) URL per asset
+  impressions_local:  [{origin, sha256, width, height, thumb, src, srcset}]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, ImageOps
+from tqdm import tqdm
+
+from enrich import make_session
+from ratelimit import HostRateLimiter
+
+DEFAULT_STORE_PATH = ".image_store"
+THUMB_SIZE = (400, 300)
+WEBP_WIDTHS = (800, 1600)
+MAX_IMAGE_BYTES = 40 * 1024 * 1024
+# what Pillow raises for truncated, corrupt or oversized images
+IMAGE_ERRORS = (OSError, ValueError, SyntaxError, Image.DecompressionBombError)
+
+# salzburg.info serves Pimcore thumbnails: /image-thumb__<asset id>__<config>/
+_PIMCORE_RE = re.compile(r"/image-thumb__(\d+)__([\w-]+)/")
+_DENSITY_RE = re.compile(r"@(\d+(?:\.\d+)?)x(?=\.\w+$)")
+_SIZE_RE = re.compile(r"[-_](\d{2,4})x(\d{2,4})(?=\.\w+$|/)")
+_WIDTH_PARAMS = ("w", "width", "imwidth")
+# Pimcore thumbnail configs by how large they tend to be
+_SMALL_CONFIGS = ("thumb", "small", "mini", "teaser", "icon", "preview")
+_LARGE_CONFIGS = ("large", "full", "original", "detail", "main", "slider", "hero")
+
+
+# ---- variant grouping ------------------------------------------------------
+
+
+def asset_key(url: str) -> str:
+    """Same key for every size/density variant of one image."""
+    parsed = urlparse(url)
+    m = _PIMCORE_RE.search(parsed.path)
+    if m:
+        return f"{parsed.netloc}/pimcore/{m.group(1)}"
+    path = _SIZE_RE.sub("", _DENSITY_RE.sub("", parsed.path))
+    return parsed.netloc + path  # query (?w=...) dropped
+
+
+def variant_rank(url: str) -> tuple:
+    """Sort key: larger is a bigger rendition of the same asset."""
+    parsed = urlparse(url)
+    width = 0
+    m = _SIZE_RE.search(parsed.path)
+    if m:
+        width = int(m.group(1))
+    query = parse_qs(parsed.query)
+    for p in _WIDTH_PARAMS:
+        if query.get(p, [""])[0].isdigit():
+            width = int(query[p][0])
+    m = _DENSITY_RE.search(parsed.path)
+    density = float(m.group(1)) if m else 1.0
+    config = 0
+    m = _PIMCORE_RE.search(parsed.path)
+    if m:
+        name = m.group(2).lower()
+        if any(w in name for w in _SMALL_CONFIGS):
+            config = -1
+        elif any(w in name for w in _LARGE_CONFIGS):
+            config = 1
+    return width, density, config
+
+
+def group_variants(urls: list[str]) -> dict[str, list[str]]:
+    """asset key -> variant URLs, both in first-seen order."""
+    groups: dict[str, list[str]] = {}
+    for u in urls:
+        groups.setdefault(asset_key(u), []).append(u)
+    return groups
+
+
+def best_variant(variants: list[str]) -> str:
+    # ties go to the later URL: srcset lists grow towards the large end
+    return max(enumerate(variants), key=lambda iu: (variant_rank(iu[1]), iu[0]))[1]
+
+
+# ---- content-addressed store ----------------------------------------------
+
+
+class Source(NamedTuple):
+    sha256: str
+    ext: str
+    width: int
+    height: int
+
+
+class ImageStore:
+    """Originals by content hash plus the URL mapping; thread-safe."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(
+            os.path.join(path, "sources.sqlite"), check_same_thread=False, timeout=30
+        )
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("""
+            CREATE TABLE IF NOT EXISTS sources (
+                url        TEXT PRIMARY KEY,
+                sha256     TEXT NOT NULL,
+                ext        TEXT NOT NULL,
+                width      INTEGER NOT NULL,
+                height     INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """)
+        self._con.commit()
+
+    def _shard(self, kind: str, name: str) -> str:
+        return os.path.join(self.path, kind, name[:2], name)
+
+    def object_path(self, src: Source) -> str:
+        return self._shard("objects", f"{src.sha256}.{src.ext}")
+
+    def derived_path(self, sha256: str, label: str) -> str:
+        return self._shard("derived", f"{sha256}-{label}.webp")
+
+    def lookup(self, url: str) -> Source | None:
+        """Stored source of `url`, if its object file is still there."""
+        with self._lock:
+            row = self._con.execute(
+                "SELECT sha256, ext, width, height FROM sources WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        src = Source(*row)
+        return src if os.path.exists(self.object_path(src)) else None
+
+    def put(self, url: str, body: bytes) -> Source | None:
+        """Store `body` under its hash; None if it is not a readable image."""
+        try:
+            with Image.open(io.BytesIO(body)) as im:  # reads the header only
+                fmt, (width, height) = im.format, im.size
+        except IMAGE_ERRORS:
+            return None
+        ext = {"JPEG": "jpg"}.get(fmt, (fmt or "bin").lower())
+        src = Source(hashlib.sha256(body).hexdigest(), ext, width, height)
+        path = self.object_path(src)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO sources "
+                "(url, sha256, ext, width, height, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, *src, time.time()),
+            )
+            self._con.commit()
+        return src
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+def download(session, url: str, store: ImageStore, limiter=None) -> Source | None:
+    if limiter:
+        limiter.acquire(url)
+    try:
+        with session.get(url, timeout=30, stream=True) as r:
+            if r.status_code != 200:
+                return None
+            body = r.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+    except Exception:
+        return None
+    if len(body) > MAX_IMAGE_BYTES:
+        return None
+    return store.put(url, body)
+
+
+# ---- derivatives -----------------------------------------------------------
+
+
+def render_widths(width: int, widths) -> list[int]:
+    """Requested widths below the original, plus the original (capped)."""
+    top = min(width, max(widths)) if widths else width
+    return sorted({w for w in widths if w < top} | {top})
+
+
+def render(src_path: str, jobs: list[tuple], quality: int = 80) -> int:
+    """
+    Write every (path, size, crop) of `jobs` that does not exist yet: `size`
+    is a width, or (w, h) to crop-fill with `crop`. Runs in a worker process.
+    """
+    jobs = [j for j in jobs if not os.path.exists(j[0])]
+    if not jobs:
+        return 0
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info else "RGB")
+        for path, size, crop in jobs:
+            if crop:
+                out = ImageOps.fit(im, size, Image.LANCZOS)
+            elif size < im.width:
+                h = max(1, round(im.height * size / im.width))
+                out = im.resize((size, h), Image.LANCZOS, reducing_gap=3.0)
+            else:
+                out = im
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            out.save(tmp, "WEBP", quality=quality, method=4)
+            os.replace(tmp, path)
+    return len(jobs)
+
+
+def derivative_jobs(store: ImageStore, src: Source, thumb, widths) -> list[tuple]:
+    label = f"{thumb[0]}x{thumb[1]}"
+    jobs = [(store.derived_path(src.sha256, label), thumb, True)]
+    for w in render_widths(src.width, widths):
+        jobs.append((store.derived_path(src.sha256, f"{w}w"), w, False))
+    return jobs
+
+
+def local_entry(store, src: Source, origin: str, thumb, widths, public_url) -> dict:
+    def public(path: str) -> str:
+        rel = os.path.relpath(path, store.path).replace(os.sep, "/")
+        return f"{public_url.rstrip('/')}/{rel}"
+
+    label = f"{thumb[0]}x{thumb[1]}"
+    sized = [
+        (w, public(store.derived_path(src.sha256, f"{w}w")))
+        for w in render_widths(src.width, widths)
+    ]
+    return {
+        "origin": origin,
+        "sha256": src.sha256,
+        "width": src.width,
+        "height": src.height,
+        "thumb": public(store.derived_path(src.sha256, label)),
+        "src": sized[-1][1],
+        "srcset": ", ".join(f"{p} {w}w" for w, p in sized),
+    }
+
+
+# ---- main ------------------------------------------------------------------
+
+
+def _size(value: str) -> tuple[int, int]:
+    w, _, h = value.lower().partition("x")
+    return int(w), int(h or w)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="inp", required=True)
+    ap.add_argument("--out", dest="out", required=True)
+    ap.add_argument("--store", default=DEFAULT_STORE_PATH, help="Image store")
+    ap.add_argument(
+        "--public-url", default="", help="Prefix for local paths in the output"
+    )
+    ap.add_argument(
+        "--thumb",
+        type=_size,
+        default=THUMB_SIZE,
+        help="Thumbnail size WxH, cropped to fill",
+    )
+    ap.add_argument(
+        "--widths",
+        default=",".join(map(str, WEBP_WIDTHS)),
+        help="WebP widths, comma-separated",
+    )
+    ap.add_argument("--quality", type=int, default=80, help="WebP quality")
+    ap.add_argument(
+        "--delay",
+        type=float,
+        default=0.2,
+        help="Seconds between downloads from one host (used when --rate is not set)",
+    )
+    ap.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Max downloads/second per host (default: 1/--delay)",
+    )
+    ap.add_argument(
+        "--burst", type=float, default=1.0, help="Token-bucket burst size per host"
+    )
+    ap.add_argument("--workers", type=int, default=8, help="Concurrent downloads")
+    ap.add_argument(
+        "--procs", type=int, default=os.cpu_count() or 1, help="Render processes"
+    )
+    ap.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="Retries per image after 429/5xx or connection errors",
+    )
+    args = ap.parse_args()
+    widths = [int(w) for w in args.widths.split(",") if w.strip()]
+    public_url = args.public_url or args.store
+
+    with open(args.inp, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # one URL per asset and record; the same asset is fetched once overall
+    picked = []
+    for item in data:
+        groups = group_variants(item.get("impressions") or [])
+        picked.append([best_variant(v) for v in groups.values()])
+    unique = list(dict.fromkeys(u for urls in picked for u in urls))
+
+    store = ImageStore(args.store)
+    sources = {u: store.lookup(u) for u in unique}
+    missing = [u for u, src in sources.items() if src is None]
+    if missing:
+        workers = max(1, args.workers)
+        session = make_session(workers, args.retries)
+        rate = args.rate or (1.0 / args.delay if args.delay > 0 else 0.0)
+        limiter = HostRateLimiter(rate, args.burst)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fetched = pool.map(lambda u: download(session, u, store, limiter), missing)
+            for u, src in zip(
+                missing, tqdm(fetched, total=len(missing), desc="Downloading")
+            ):
+                sources[u] = src
+        session.close()
+
+    assets = {src.sha256: src for src in sources.values() if src}
+    jobs = {
+        sha: derivative_jobs(store, src, args.thumb, widths)
+        for sha, src in assets.items()
+    }
+    todo = [
+        sha for sha, js in jobs.items() if any(not os.path.exists(j[0]) for j in js)
+    ]
+    rendered = 0
+    if todo:
+        with ProcessPoolExecutor(max(1, args.procs)) as pool:
+            futures = [
+                pool.submit(
+                    render, store.object_path(assets[sha]), jobs[sha], args.quality
+                )
+                for sha in todo
+            ]
+            origin = {src.sha256: u for u, src in sources.items() if src}
+            for sha, fut in zip(todo, tqdm(futures, desc="Rendering")):
+                try:
+                    rendered += fut.result()
+                except IMAGE_ERRORS as e:
+                    # no derivatives, so the image is left out of the output
+                    tqdm.write(f"render failed for {origin[sha]}: {e!r}")
+
+    out = []
+    for item, urls in zip(data, picked):
+        rec = dict(item)
+        if item.get("impressions") is not None:
+            rec["impressions"] = urls
+            rec["impressions_local"] = [
+                local_entry(store, sources[u], u, args.thumb, widths, public_url)
+                for u in urls
+                if sources[u]
+                and all(os.path.exists(j[0]) for j in jobs[sources[u].sha256])
+            ]
+        out.append(rec)
+    store.close()
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+
+    failed = sum(1 for src in sources.values() if src is None)
+    print(
+        f"{len(unique)} images ({len(assets)} unique assets, {len(missing)} "
+        f"requested, {failed} failed), {rendered} files rendered"
+    )
+    print(f"Wrote {len(out)} records → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
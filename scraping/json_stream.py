@@ -0,0 +1,203 @@
+"""
+Streaming extraction of records from large JSON payloads
+--------------------------------------------------------
+Hub API pages are a JSON object with the records in one array somewhere
+inside (`records_path`, e.g. ["data"]). `iter_raw_records` reads the response
+in chunks, walks down to that array and yields every element as its raw JSON
+bytes, without building Python objects, so the bytes can go straight into an
+NDJSON file. Memory is bounded by the largest single record plus one chunk.
+
+  resp = session.get(url, stream=True)
+  for raw in iter_raw_records(resp.iter_content(1 << 16), ["data"]):
+      out.write(raw + b"\n")
+
+The scanner checks the structure it walks through (brackets, strings,
+separators) but not the contents of the records it copies; malformed records
+surface when the NDJSON is loaded. Line breaks between tokens are replaced by
+spaces (JSON strings cannot contain raw line breaks), so every record is one
+NDJSON line.
+"""
+
+import json
+import re
+
+# a complete string, or a bracket; a lone quote is a string cut off by the
+# end of the buffer
+_TOKEN_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|["\[\]{}]', re.S)
+_STRING_RE = re.compile(rb'["\\]')
+_SCALAR_END_RE = re.compile(rb"[\s,\]}]")
+_WS = b" \t\r\n"
+_VALUE_START = b'{["-0123456789tfn'
+_OPEN, _CLOSE = b"[{", b"]}"
+
+
+class _Buffer:
+    """Bytes pulled from an iterator of chunks on demand."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.buf = bytearray()
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            if chunk:
+                self.buf += chunk
+                return True
+        return False
+
+    def discard(self) -> None:
+        """Drop the bytes before pos once they are no longer referenced."""
+        if self.pos > 1 << 16:
+            del self.buf[: self.pos]
+            self.pos = 0
+
+    def peek(self) -> int | None:
+        """Next non-whitespace byte (pos moves to it), or None at the end."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return None
+
+    def _search(self, regex, start: int):
+        while True:
+            m = regex.search(self.buf, start)
+            if m:
+                return m
+            start = len(self.buf)
+            if not self._fill():
+                return None
+
+    def skip_string(self, i: int) -> int:
+        """End of the string starting with the quote at i."""
+        i += 1
+        while True:
+            m = self._search(_STRING_RE, i)
+            if m is None:
+                raise ValueError("unterminated JSON string")
+            if m.group() == b'"':
+                return m.end()
+            i = m.end() + 1  # skip the escaped byte
+            while i > len(self.buf) and self._fill():
+                pass
+
+    def skip_value(self, i: int) -> int:
+        """End of the JSON value starting at i."""
+        c = self.buf[i]
+        if c == 0x22:  # '"'
+            return self.skip_string(i)
+        if c not in _OPEN:
+            m = self._search(_SCALAR_END_RE, i)
+            return m.start() if m else len(self.buf)
+        depth = 0
+        while True:
+            for m in _TOKEN_RE.finditer(self.buf, i):
+                start, end = m.span()
+                c = self.buf[start]
+                if c == 0x22:  # '"'
+                    if end - start == 1:
+                        i = start
+                        break
+                    continue
+                depth += 1 if c in _OPEN else -1
+                if depth == 0:
+                    return end
+            else:
+                i = len(self.buf)
+            if not self._fill():
+                raise ValueError("truncated JSON")
+
+    def expect(self, ch: bytes) -> None:
+        if self.peek() != ch[0]:
+            raise ValueError(f"expected {ch.decode()} in JSON")
+        self.pos += 1
+
+    def next_item(self, close: bytes) -> bool:
+        """After a member/element: True if another one follows."""
+        c = self.peek()
+        if c == 0x2C:  # ','
+            self.pos += 1
+            return True
+        if c == close[0]:
+            self.pos += 1
+            return False
+        raise ValueError("expected , or closing bracket in JSON")
+
+
+def _enter(r: _Buffer, key) -> bool:
+    """Move r.pos to the value of `key` (str) / element `key` (int)."""
+    if isinstance(key, int):
+        if r.peek() != 0x5B:  # '['
+            return False
+        r.pos += 1
+        if r.peek() == 0x5D:
+            return False
+        for _ in range(key):
+            r.pos = r.skip_value(r.pos)
+            if not r.next_item(b"]"):
+                return False
+            r.peek()
+        return True
+    if r.peek() != 0x7B:  # '{'
+        return False
+    r.pos += 1
+    if r.peek() == 0x7D:
+        return False
+    while True:
+        if r.peek() != 0x22:
+            raise ValueError("expected object key in JSON")
+        end = r.skip_string(r.pos)
+        name = json.loads(bytes(r.buf[r.pos : end]))
+        r.pos = end
+        r.expect(b":")
+        r.peek()
+        if name == key:
+            return True
+        r.pos = r.skip_value(r.pos)
+        if not r.next_item(b"}"):
+            return False
+        r.discard()
+
+
+def _one_line(raw: bytes) -> bytes:
+    if b"\n" in raw or b"\r" in raw:
+        raw = raw.replace(b"\r\n", b" ").replace(b"\n", b" ").replace(b"\r", b" ")
+    return raw
+
+
+def iter_raw_records(chunks, path: list[str | int], wrap_object: bool = False):
+    """
+    Yield the raw bytes of each element of the array at `path` (nothing if
+    the path is missing or not an array). With `wrap_object`, an object at
+    `path` is yielded as a single record, like the non-paginated loader.
+    """
+    r = _Buffer(chunks)
+    c = r.peek()
+    if c is None:
+        raise ValueError("empty JSON document")
+    if c not in _VALUE_START:
+        raise ValueError("not a JSON document")
+    for key in path:
+        if not _enter(r, key):
+            return
+    c = r.peek()
+    if c == 0x7B and wrap_object:
+        end = r.skip_value(r.pos)
+        yield _one_line(bytes(r.buf[r.pos : end]))
+        return
+    if c != 0x5B:  # '['
+        return
+    r.pos += 1
+    if r.peek() == 0x5D:
+        return
+    while True:
+        r.peek()
+        end = r.skip_value(r.pos)
+        yield _one_line(bytes(r.buf[r.pos : end]))
+        r.pos = end
+        if not r.next_item(b"]"):
+            return
+        r.discard()
@@ -1,5 +1,8 @@
-# pip install duckdb requests orjson
-import os, pathlib, re, requests, orjson, duckdb
+# pip install duckdb requests orjson pyarrow
+import os, pathlib, re, requests, duckdb
+
+from hub_schema import DeclaredSchema
+from json_stream import iter_raw_records
 
 BASE_URL = "https://connector.hub.austria.info/data/"
 TOKEN = os.environ.get("HUB_BEARER_TOKEN", "").strip()
@@ -20,6 +23,21 @@ for d in (RAW_DIR, DB_DIR):
 DB_PATH = DB_DIR / "hub_min.duckdb"
 TABLE = "items"
 
+# Declared column types (see hub_schema.py). The hub sends addresses,
+# categories, features and media_objects as JSON encoded in strings; they are
+# expanded into native LIST/STRUCT columns once, at load time. Fields not
+# listed here are not loaded and show up in the schema drift report.
+SCHEMA = {
+    "id": "VARCHAR",
+    "title": "VARCHAR",
+    "city": "VARCHAR",
+    "country": "VARCHAR",
+    "addresses": "STRUCT(rel VARCHAR, name VARCHAR, email VARCHAR, phone VARCHAR)[]",
+    "categories": "JSON[]",
+    "features": "JSON[]",
+    "media_objects": "JSON[]",
+}
+
 
 def qident(name: str) -> str:
     return (
@@ -29,55 +47,60 @@ def qident(name: str) -> str:
     )
 
 
-def write_jsonl(path: pathlib.Path, records):
+def write_jsonl(path: pathlib.Path, raw_records) -> int:
+    """Write already-encoded records (bytes) one per line."""
+    n = 0
     with open(path, "wb") as f:
-        for rec in records:
-            f.write(orjson.dumps(rec))
+        for raw in raw_records:
+            f.write(raw)
             f.write(b"\n")
+            n += 1
+    return n
 
 
 def main():
     print("=== hub-min: fetching ===")
-    r = requests.get(BASE_URL, headers=HEADERS, timeout=60)
+    r = requests.get(BASE_URL, headers=HEADERS, timeout=60, stream=True)
     print(f"HTTP {r.status_code}")
     if r.status_code >= 400:
         print(r.text[:500])
         r.raise_for_status()
 
+    # Accept single object or list; records are copied from the response as
+    # it arrives instead of decoding the whole body
+    out_file = RAW_DIR / "page_000001.jsonl"
     try:
-        payload = r.json()
+        with r:
+            records = iter_raw_records(r.iter_content(1 << 16), [], wrap_object=True)
+            count = write_jsonl(out_file, records)
     except ValueError:
         raise SystemExit("Response was not JSON (check token/URL).")
+    print(f"wrote {count} record(s) -> {out_file}")
 
-    # Accept single object or list
-    records = payload if isinstance(payload, list) else [payload]
-
-    out_file = RAW_DIR / "page_000001.jsonl"
-    write_jsonl(out_file, records)
-    print(f"wrote {len(records)} record(s) -> {out_file}")
-
-    # Load into DuckDB
+    # Load into DuckDB with the declared types
+    schema = DeclaredSchema(SCHEMA)
     con = duckdb.connect(str(DB_PATH))
-    glob = (RAW_DIR / "*.jsonl").as_posix()
+    glob = f"'{(RAW_DIR / '*.jsonl').as_posix()}'"
     con.execute(f"""
         CREATE OR REPLACE TABLE {qident(TABLE)} AS
-        SELECT * FROM read_json_auto('{glob}');
+        SELECT * FROM {schema.read_sql(glob)};
     """)
     count = con.execute(f"SELECT COUNT(*) FROM {qident(TABLE)}").fetchone()[0]
     print(f"duckdb: loaded {count} row(s) into {DB_PATH} table {TABLE}")
+    for line in schema.ndjson_drift(con, glob).report(schema):
+        print(f"schema drift: {line}")
 
-    # --- Preview: parse JSON-encoded strings into real JSON and show a few useful columns ---
-    # from_json() turns a JSON string into a JSON value DuckDB can work with.
+    # --- Preview: the JSON-in-string fields are native lists now ---
     preview_sql = f"""
         SELECT
             id,
             title,
             city,
             country,
-            json_array_length(from_json(addresses))            AS addresses_len,
-            json_array_length(from_json(categories))           AS categories_len,
-            json_array_length(from_json(features))             AS features_len,
-            json_array_length(from_json(media_objects))        AS media_len
+            len(addresses)      AS addresses_len,
+            len(categories)     AS categories_len,
+            len(features)       AS features_len,
+            len(media_objects)  AS media_len
         FROM {qident(TABLE)}
         LIMIT 5
     """
@@ -95,7 +118,7 @@ def main():
     def fmt_row(r):
         return " | ".join(str(v).ljust(widths[i]) for i, v in enumerate(r))
 
-    print("\npreview (parsed counts of JSON-in-string fields):")
+    print("\npreview (list lengths of the expanded fields):")
     if rows:
         print(fmt_row(cols))
         print("-+-".join("-" * w for w in widths))
@@ -104,16 +127,10 @@ def main():
     else:
         print("(no rows)")
 
-    # Example: fully expand one JSON field (addresses) into rows
+    # Example: one row per address, straight from the STRUCT list
     expand_sql = f"""
-        SELECT
-            i.id,
-            a.value->>'rel'   AS rel,
-            a.value->>'name'  AS name,
-            a.value->>'email' AS email,
-            a.value->>'phone' AS phone
-        FROM {qident(TABLE)} i,
-             json_each(from_json(i.addresses)) AS a
+        SELECT id, a.rel, a.name, a.email, a.phone
+        FROM (SELECT id, unnest(addresses) AS a FROM {qident(TABLE)})
         LIMIT 10
     """
     print("\naddresses (expanded):")
@@ -0,0 +1,152 @@
+"""
+Append-only NDJSON record sink with checkpoints
+-----------------------------------------------
+The crawler streams records to `<name>.ndjson` as pages are extracted and
+logs every finished page URL to `<name>.ndjson.done`. Every `checkpoint_every`
+pages both files are flushed and fsynced, and their sizes are written
+atomically to `<name>.ndjson.ckpt`.
+
+On resume the files are truncated back to the last checkpoint (dropping any
+half-written tail) and the logged URLs are skipped. `compact_ndjson` turns the
+stream into the final JSON array in bounded memory.
+"""
+
+import json
+import os
+import textwrap
+import time
+
+import orjson
+
+
+class RecordSink:
+    def __init__(self, path: str, checkpoint_every: int = 50, resume: bool = False):
+        self.path = path
+        self.done_path = path + ".done"
+        self.ckpt_path = path + ".ckpt"
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.done_urls: set[str] = set()
+        self.pages = 0
+        self.records = 0
+        self._since_ckpt = 0
+
+        ckpt = self._read_checkpoint() if resume else None
+        if ckpt and (
+            self._size(self.path) < ckpt["records_bytes"]
+            or self._size(self.done_path) < ckpt["done_bytes"]
+        ):
+            ckpt = None  # files are shorter than the checkpoint: start over
+        if ckpt:
+            self._records_f = self._open_at(self.path, ckpt["records_bytes"])
+            self._done_f = self._open_at(self.done_path, ckpt["done_bytes"])
+            self.pages = ckpt["pages"]
+            self.records = ckpt["records"]
+            with open(self.done_path, "r", encoding="utf-8") as f:
+                self.done_urls = {ln.rstrip("\n") for ln in f if ln.strip()}
+        else:
+            self._records_f = open(self.path, "wb")
+            self._done_f = open(self.done_path, "wb")
+            self.checkpoint()
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return -1
+
+    @staticmethod
+    def _open_at(path: str, size: int):
+        f = open(path, "r+b")
+        f.truncate(size)
+        f.seek(size)
+        return f
+
+    def _read_checkpoint(self) -> dict | None:
+        try:
+            with open(self.ckpt_path, "rb") as f:
+                return orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def write_page(self, url: str, records: list[dict]) -> None:
+        """Append one page's records and mark the page as done."""
+        self.write_records(records)
+        self._done_f.write(url.encode("utf-8") + b"\n")
+        self.done_urls.add(url)
+        self.pages += 1
+        self._since_ckpt += 1
+        if self._since_ckpt >= self.checkpoint_every:
+            self.checkpoint()
+
+    def write_records(self, records) -> None:
+        for rec in records:
+            self._records_f.write(orjson.dumps(rec))
+            self._records_f.write(b"\n")
+            self.records += 1
+
+    def checkpoint(self) -> None:
+        for f in (self._records_f, self._done_f):
+            f.flush()
+            os.fsync(f.fileno())
+        ckpt = {
+            "records_bytes": self._records_f.tell(),
+            "done_bytes": self._done_f.tell(),
+            "pages": self.pages,
+            "records": self.records,
+            "updated_at": time.time(),
+        }
+        tmp = self.ckpt_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(ckpt))
+        os.replace(tmp, self.ckpt_path)
+        self._since_ckpt = 0
+
+    def close(self) -> None:
+        self.checkpoint()
+        self._records_f.close()
+        self._done_f.close()
+
+
+def compact_ndjson(ndjson_path: str, out_path: str, key, score) -> int:
+    """
+    Deduplicate an NDJSON record file into a JSON array at `out_path`.
+
+    Pass 1 keeps only (first-seen order, score, byte offset) per key; the
+    later record wins ties, like a dict overwrite. Pass 2 seeks to the winning
+    lines and writes them in first-seen key order, formatted like
+    json.dump(..., indent=2). Memory grows with the number of keys, not with
+    the size of the records.
+    """
+    best: dict = {}
+    with open(ndjson_path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                rec = orjson.loads(line)
+                k = key(rec)
+                s = score(rec)
+                prev = best.get(k)
+                if prev is None:
+                    best[k] = (len(best), s, offset)
+                elif s >= prev[1]:
+                    best[k] = (prev[0], s, offset)
+            offset += len(line)
+
+    winners = sorted(best.values())
+    best.clear()
+    tmp = out_path + ".tmp"
+    with open(ndjson_path, "rb") as src, open(tmp, "w", encoding="utf-8") as out:
+        if not winners:
+            out.write("[]")
+        for i, (_, _, off) in enumerate(winners):
+            src.seek(off)
+            rec = orjson.loads(src.readline())
+            out.write("[\n" if i == 0 else ",\n")
+            out.write(
+                textwrap.indent(json.dumps(rec, ensure_ascii=False, indent=2), "  ")
+            )
+        if winners:
+            out.write("\n]")
+    os.replace(tmp, out_path)
+    return len(winners)
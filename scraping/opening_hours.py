@@ -0,0 +1,355 @@
+"""
+Opening-hours parser and weekly bitmap index
+--------------------------------------------
+Turns free-text opening hours (German or English, as found on salzburg.info)
+into a 7 x 96 quarter-hour bitmap (Mo..Su x 00:00..24:00), and answers
+"is it open?" questions for many POIs at once with NumPy.
+
+  oh = parse_opening_hours("Di-So 9:30-17 Uhr, Montag Ruhetag")
+  oh.bits                      # bool[7, 96]
+  to_schedule(oh.bits)         # {"mo": {"from": 0, "to": 0}, "tu": {"from": 930, ...}
+  encode_bits(oh.bits)         # 168 hex chars (84 packed bytes) for JSON
+
+  index = OpeningHoursIndex.from_records(enriched)   # uses "opening_hours_bits"
+  index.is_open(datetime(2025, 7, 1, 15, 30))        # bool per POI
+  index.is_open(ts, ids=["poi-1", "poi-2"])
+  index.open_during(start, end, whole=True)          # open the entire interval
+
+What the parser understands: day names, abbreviations and ranges ("Mo-Fr",
+"Dienstag bis Sonntag", "Mon to Sat"), "täglich"/"daily", "werktags",
+"wochentags"/"weekdays", "Wochenende"/"weekend", one or more time ranges per
+day ("9-12 und 14-18 Uhr", "9:30 am - 5 pm", "0-24 Uhr", overnight ranges),
+"rund um die Uhr"/"24 hours", closed days ("Montag geschlossen", "Ruhetag:
+Montag", "closed on Mondays") and whether public holidays are open. Clauses
+naming months (seasonal hours) are only used when nothing else was found.
+Timestamps are interpreted in Europe/Vienna time.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+SLOTS_PER_DAY = 96  # quarter hours
+WEEK_SLOTS = 7 * SLOTS_PER_DAY
+DAY_KEYS = ("mo", "tu", "we", "th", "fr", "sa", "su")
+LOCAL_TZ = ZoneInfo("Europe/Vienna")
+
+ALL_DAYS = frozenset(range(7))
+DAY_PREFIX = {
+    "mo": 0,
+    "di": 1,
+    "tu": 1,
+    "mi": 2,
+    "we": 2,
+    "do": 3,
+    "th": 3,
+    "fr": 4,
+    "sa": 5,
+    "so": 6,
+    "su": 6,
+}
+
+# two-letter German abbreviations only count when capitalised ("So" vs "so")
+_DAY = (
+    r"(?:\b(?:montags?|dienstags?|mittwochs?|donnerstags?|freitags?|samstags?"
+    r"|sonnabends?|sonntags?|monday|tuesday|wednesday|thursday|friday|saturday"
+    r"|sunday|mon|tues?|wed|thu(?:rs?)?|fri|sat|sun"
+    r"|(?-i:Mo|Di|Mi|Do|Fr|Sa|So))\b|\bsonn-)\.?"
+)
+_RANGE_SEP = r"\s*(?:-|–|—|bis|to|through|until|till)\s*"
+_TIME = (
+    r"(?<![\d.:])\d{1,2}(?:[:.]\d{2})?"
+    r"(?!\.\d|\.\s*[-–—]|\.\s*bis|\d)\s*(?:uhr|h\b|a\.?m\.?|p\.?m\.?)?"
+)
+TOKEN_RE = re.compile(
+    rf"(?P<dayrange>{_DAY}{_RANGE_SEP}{_DAY})"
+    r"|(?P<allday>\b(?:rund\s+um\s+die\s+uhr|around\s+the\s+clock"
+    r"|24\s*(?:stunden|hours|h)\b))"
+    rf"|(?P<time>{_TIME}{_RANGE_SEP}{_TIME})"
+    r"|(?P<daily>\b(?:t(?:ä|ae)glich|daily|every\s+day|jeden\s+tag)\b)"
+    r"|(?P<weekdays>\b(?:wochentags|weekdays)\b)"
+    r"|(?P<workdays>\b(?:werktags|werktage)\b)"
+    r"|(?P<weekend>\b(?:wochenenden?|weekends?)\b)"
+    r"|(?P<holiday>\b(?:feiertag\w*|(?:public\s+)?holidays?)\b)"
+    r"|(?P<closed>\b(?:geschlossen|closed|ruhetag\w*)\b)"
+    r"|(?P<open>\b(?:ge(?:ö|oe)ffnet|open)\b)"
+    rf"|(?P<day>{_DAY})",
+    re.IGNORECASE,
+)
+_DAY_RE = re.compile(_DAY, re.IGNORECASE)
+_TIME_PART_RE = re.compile(
+    r"(\d{1,2})(?:[:.](\d{2}))?\s*(uhr|h|a\.?m\.?|p\.?m\.?)?", re.IGNORECASE
+)
+_CLAUSE_SPLIT_RE = re.compile(r"[\n;|•]+")
+_MONTH_RE = re.compile(
+    r"\b(?:j(?:ä|ae)nner|januar|january|februar|february|m(?:ä|ae)rz|march|april"
+    r"|mai|may|juni|june|juli|july|august|september|oktober|october|november"
+    r"|dezember|december)\b",
+    re.IGNORECASE,
+)
+
+
+class OpeningHours(NamedTuple):
+    bits: np.ndarray  # bool[7, 96]
+    opened_on_holidays: bool | None  # None: not mentioned
+
+
+def _day_index(word: str) -> int:
+    word = word.lower()
+    if word.startswith("sonnabend"):
+        return 5
+    return DAY_PREFIX[word[:2]]
+
+
+def _parse_time(part: str) -> tuple[int, int, str]:
+    m = _TIME_PART_RE.match(part.strip())
+    suffix = (m.group(3) or "").lower().replace(".", "")
+    return int(m.group(1)), int(m.group(2) or 0), suffix
+
+
+def _time_range(text: str) -> tuple[int, int] | None:
+    """(start_minute, end_minute) of "9:30 - 17 Uhr"; None if not a time."""
+    parts = re.split(_RANGE_SEP, text, maxsplit=1, flags=re.IGNORECASE)
+    if len(parts) != 2:
+        return None
+    (h1, m1, s1), (h2, m2, s2) = _parse_time(parts[0]), _parse_time(parts[1])
+    if s2 == "pm" and h2 < 12:
+        h2 += 12
+    if s1 == "pm" and h1 < 12:
+        h1 += 12
+    elif s1 == "am" and h1 == 12:
+        h1 = 0
+    elif not s1 and s2 == "pm" and h1 + 12 <= h2:
+        h1 += 12  # "1-5 pm"
+    if s2 == "am" and h2 == 12:
+        h2 = 0
+    if h1 > 24 or h2 > 24 or m1 > 59 or m2 > 59:
+        return None
+    start, end = h1 * 60 + m1, h2 * 60 + m2
+    if start == end or start >= 24 * 60:
+        return None
+    return start, end
+
+
+def _fill(bits: np.ndarray, days, start: int, end: int) -> None:
+    lo = start // 15
+    hi = -(-end // 15)  # ceil
+    for d in days:
+        if end > start:
+            bits[d, lo:hi] = True
+        else:  # past midnight: runs into the next day
+            bits[d, lo:] = True
+            bits[(d + 1) % 7, :hi] = True
+
+
+def _parse_clauses(clauses: list[str]):
+    bits = np.zeros((7, SLOTS_PER_DAY), dtype=bool)
+    closed: set[int] = set()
+    holidays = None
+    carry = None  # days named at the end of a clause without times
+    for clause in clauses:
+        days = carry
+        timed = False
+        closed_group = False
+        holiday_group = False
+        close_pending = False  # "geschlossen:"/"closed on" before the days
+        pending_closed: set[int] = set()
+        last_days = None
+
+        def start_days(new):
+            nonlocal days, timed, closed_group, holiday_group
+            if days is None or timed or closed_group:
+                days, timed, closed_group, holiday_group = set(), False, False, False
+            days |= new
+            if close_pending:
+                closed.update(new)
+                pending_closed.update(new)
+                closed_group = True
+
+        for m in TOKEN_RE.finditer(clause):
+            kind = m.lastgroup
+            text = m.group(0)
+            if kind == "dayrange":
+                a, b = (_day_index(w) for w in _DAY_RE.findall(text)[:2])
+                start_days({(a + i) % 7 for i in range((b - a) % 7 + 1)})
+            elif kind == "day":
+                start_days({_day_index(text)})
+            elif kind == "daily":
+                start_days(set(ALL_DAYS))
+            elif kind == "weekdays":
+                start_days(set(range(5)))
+            elif kind == "workdays":
+                start_days(set(range(6)))
+            elif kind == "weekend":
+                start_days({5, 6})
+            elif kind == "holiday":
+                start_days(set())
+                holiday_group = True
+                if close_pending:
+                    holidays = False
+            elif kind in ("time", "allday"):
+                span = (0, 24 * 60) if kind == "allday" else _time_range(text)
+                if span is None:
+                    continue
+                target = days if days is not None else (last_days or ALL_DAYS)
+                _fill(bits, target, *span)
+                # "geschlossen: Montag, Di-So 9-17": the timed days are open
+                closed.difference_update(pending_closed & set(target))
+                if holiday_group:
+                    holidays = True
+                timed = True
+                last_days = target
+            elif kind == "closed":
+                if days is not None and not timed and not closed_group:
+                    closed.update(days)
+                    closed_group = True
+                    if holiday_group:
+                        holidays = False
+                else:
+                    close_pending = True
+            elif kind == "open" and holiday_group and not timed:
+                holidays = True
+        carry = days if days and not timed and not closed_group else None
+    for d in closed:
+        bits[d] = False
+    return bits, holidays
+
+
+def parse_opening_hours(text: str | None) -> OpeningHours | None:
+    """Weekly bitmap for `text`, or None if no opening times were found."""
+    if not text:
+        return None
+    clauses = [c for c in _CLAUSE_SPLIT_RE.split(text) if c.strip()]
+    regular = [c for c in clauses if not _MONTH_RE.search(c)]
+    bits, holidays = _parse_clauses(regular)
+    if not bits.any() and len(regular) < len(clauses):
+        bits, holidays = _parse_clauses(clauses)  # only seasonal hours given
+    if not bits.any():
+        return None
+    return OpeningHours(bits, holidays)
+
+
+def _runs(row: np.ndarray) -> list[tuple[int, int]]:
+    """[start_slot, end_slot) of each open stretch of one day."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def _hhmm(slot: int) -> int:
+    return (slot // 4) * 100 + (slot % 4) * 15
+
+
+def to_schedule(bits: np.ndarray) -> dict:
+    """
+    {"mo": {"from": HHMM, "to": HHMM}, ...}; 0/0 for closed days. Hours past
+    midnight belong to the evening they started on ("to" < "from"), so a
+    Friday 20-02 bar shows fr 2000-200 rather than sa 0-200.
+    """
+    runs = [_runs(bits[d]) for d in range(7)]
+
+    def spill(d):  # the day starts with the previous night's hours
+        r, prev = runs[d], runs[d - 1]
+        return bool(r and prev) and r[0][0] == 0 and r[0][1] < 96 and prev[-1][1] == 96
+
+    out = {}
+    for d, key in enumerate(DAY_KEYS):
+        own = runs[d][1:] if spill(d) else runs[d]
+        if not own:
+            out[key] = {"from": 0, "to": 0}
+            continue
+        first, last = own[0][0], own[-1][1]
+        nxt = (d + 1) % 7
+        if last == 96 and spill(nxt):
+            last = runs[nxt][0][1]
+        out[key] = {"from": _hhmm(first), "to": _hhmm(last)}
+    return out
+
+
+def encode_bits(bits: np.ndarray) -> str:
+    return np.packbits(bits.reshape(-1)).tobytes().hex()
+
+
+def decode_bits(hexstr: str) -> np.ndarray:
+    packed = np.frombuffer(bytes.fromhex(hexstr), dtype=np.uint8)
+    return np.unpackbits(packed)[:WEEK_SLOTS].astype(bool).reshape(7, SLOTS_PER_DAY)
+
+
+def week_slot(when) -> int:
+    """Quarter-hour slot of the week (0 = Monday 00:00) in Salzburg time."""
+    if not isinstance(when, datetime):
+        when = datetime.fromtimestamp(float(when), timezone.utc)
+    if when.tzinfo is not None:
+        when = when.astimezone(LOCAL_TZ)
+    return when.weekday() * SLOTS_PER_DAY + when.hour * 4 + when.minute // 15
+
+
+class OpeningHoursIndex:
+    """Packed weekly bitmaps of many POIs: one row of 84 bytes per POI."""
+
+    def __init__(self, ids: list[str], packed: np.ndarray):
+        self.ids = list(ids)
+        self.packed = packed  # uint8[n, 84]
+        self._row = {poi: i for i, poi in enumerate(self.ids)}
+
+    @classmethod
+    def from_records(cls, records, key: str = "opening_hours_bits"):
+        """Index every record that has a bitmap, by its "id"."""
+        ids, rows = [], []
+        for r in records:
+            if r.get(key):
+                ids.append(r.get("id") or r.get("url"))
+                rows.append(np.frombuffer(bytes.fromhex(r[key]), dtype=np.uint8))
+        packed = np.vstack(rows) if rows else np.zeros((0, WEEK_SLOTS // 8), np.uint8)
+        return cls(ids, packed)
+
+    def rows(self, ids=None) -> np.ndarray:
+        if ids is None:
+            return np.arange(len(self.ids))
+        return np.fromiter((self._row[i] for i in ids), dtype=np.intp)
+
+    def is_open(self, when, ids=None) -> np.ndarray:
+        """
+        bool per POI (all, or `ids` in that order). `when` is one datetime /
+        epoch second, or one per POI.
+        """
+        rows = self.rows(ids)
+        if isinstance(when, (list, tuple, np.ndarray)):
+            slots = np.fromiter((week_slot(w) for w in when), dtype=np.intp)
+        else:
+            slots = np.full(len(rows), week_slot(when), dtype=np.intp)
+        byte = self.packed[rows, slots >> 3]
+        return ((byte >> (7 - (slots & 7))) & 1).astype(bool)
+
+    def open_during(self, start, end, ids=None, whole: bool = False) -> np.ndarray:
+        """
+        bool per POI: open at some point in [start, end), or for all of it
+        with `whole=True`. Intervals of a week or longer cover every slot.
+        """
+        s = week_slot(start)
+        span = _seconds(end) - _seconds(start)
+        # last slot touched by the interval (the instant itself if empty)
+        last = week_slot(_seconds(end) - 1e-6) if span > 0 else s
+        mask = np.zeros(WEEK_SLOTS, dtype=bool)
+        if span >= 7 * 86400:
+            mask[:] = True
+        elif last >= s:
+            mask[s : last + 1] = True
+        else:  # wraps past Sunday midnight
+            mask[s:] = True
+            mask[: last + 1] = True
+        m = np.packbits(mask)
+        hit = self.packed[self.rows(ids)] & m
+        if whole:
+            return (hit == m).all(axis=1)
+        return hit.any(axis=1)
+
+
+def _seconds(when) -> float:
+    if isinstance(when, datetime):
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=LOCAL_TZ)
+        return when.timestamp()
+    return float(when)
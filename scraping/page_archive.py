@@ -0,0 +1,205 @@
+"""
+Append-only compressed archive of fetched pages
+-----------------------------------------------
+scrape_sc.py stores every fetched page body here so extractors can be re-run
+(scrape_sc.py --reextract, enrich.py --archive) without touching the network.
+
+Layout of the archive directory:
+
+  seg-00001.warc.gz       WARC/1.1 "resource" records, one gzip member each
+  seg-00001.warc.gz.idx   one line per record: url, offset, length, sha256,
+                          fetched_at (tab-separated)
+  seg-00002.warc.gz ...
+
+Each writer session starts a new segment and rolls over after
+`segment_bytes`, so finished segments are never modified. Because every record
+is its own gzip member, a record can be read with one seek + decompress, and
+segments (or slices of them) can be processed in parallel. The index is the
+source of truth: a record whose index line was not written (crash) is ignored.
+A page is only appended when its body differs from the latest archived copy.
+
+  archive = PageArchive(".page_archive")
+  archive.append(url, body)
+  archive.close()
+
+  reader = ArchiveReader(".page_archive")
+  reader.get(url)   # latest body or None
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import time
+import uuid
+from typing import NamedTuple
+
+DEFAULT_ARCHIVE_PATH = ".page_archive"
+SEGMENT_BYTES = 64 * 1024 * 1024
+_SEGMENT_RE = re.compile(r"^seg-(\d+)\.warc\.gz$")
+
+
+class ArchiveEntry(NamedTuple):
+    segment: str  # file name inside the archive directory
+    offset: int
+    length: int  # compressed size of the gzip member
+    digest: str  # sha256 of the body
+    fetched_at: float
+
+
+def list_segments(path: str) -> list[str]:
+    try:
+        names = os.listdir(path)
+    except FileNotFoundError:
+        return []
+    return sorted(n for n in names if _SEGMENT_RE.match(n))
+
+
+def load_index(path: str) -> dict[str, ArchiveEntry]:
+    """Latest archived copy per URL (later segments and lines win)."""
+    latest: dict[str, ArchiveEntry] = {}
+    for seg in list_segments(path):
+        size = os.path.getsize(os.path.join(path, seg))
+        try:
+            f = open(os.path.join(path, seg + ".idx"), "r", encoding="utf-8")
+        except FileNotFoundError:
+            continue
+        with f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 5:
+                    continue  # torn last line
+                url, offset, length, digest, fetched_at = parts
+                entry = ArchiveEntry(
+                    seg, int(offset), int(length), digest, float(fetched_at)
+                )
+                if entry.offset + entry.length <= size:
+                    latest[url] = entry
+    return latest
+
+
+def by_segment(index: dict[str, ArchiveEntry]) -> dict[str, list[tuple]]:
+    """Group (url, entry) pairs by segment, in file order."""
+    groups: dict[str, list[tuple]] = {}
+    for url, entry in index.items():
+        groups.setdefault(entry.segment, []).append((url, entry))
+    for entries in groups.values():
+        entries.sort(key=lambda ue: ue[1].offset)
+    return dict(sorted(groups.items()))
+
+
+def _parse_record(member: bytes) -> bytes:
+    data = gzip.decompress(member)
+    head, _, rest = data.partition(b"\r\n\r\n")
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            return rest[: int(line.split(b":", 1)[1])]
+    return rest.removesuffix(b"\r\n\r\n")
+
+
+def read_entry(path: str, entry: ArchiveEntry) -> bytes:
+    with open(os.path.join(path, entry.segment), "rb") as f:
+        f.seek(entry.offset)
+        return _parse_record(f.read(entry.length))
+
+
+def iter_segment(path: str, segment: str, entries):
+    """Yield (url, body) for `entries` of one segment, reading it once."""
+    with open(os.path.join(path, segment), "rb") as f:
+        for url, entry in entries:
+            f.seek(entry.offset)
+            yield url, _parse_record(f.read(entry.length))
+
+
+class PageArchive:
+    """Single writer; appends go to a fresh segment per session."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_ARCHIVE_PATH,
+        segment_bytes: int = SEGMENT_BYTES,
+        compresslevel: int = 6,
+    ):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.compresslevel = compresslevel
+        os.makedirs(path, exist_ok=True)
+        self._latest = {url: e.digest for url, e in load_index(path).items()}
+        segs = list_segments(path)
+        self._seq = int(_SEGMENT_RE.match(segs[-1]).group(1)) if segs else 0
+        self._seg = self._idx = None
+        self.appended = 0
+
+    def _roll(self) -> None:
+        self._close_segment()
+        self._seq += 1
+        name = f"seg-{self._seq:05d}.warc.gz"
+        self._seg = open(os.path.join(self.path, name), "ab")
+        self._idx = open(os.path.join(self.path, name + ".idx"), "a", encoding="utf-8")
+
+    def _close_segment(self) -> None:
+        for f in (self._seg, self._idx):
+            if f:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+        self._seg = self._idx = None
+
+    def append(
+        self,
+        url: str,
+        body: bytes,
+        digest: str | None = None,
+        content_type: str = "text/html",
+    ) -> bool:
+        """Archive `body` unless it equals the latest copy of `url`."""
+        digest = digest or hashlib.sha256(body).hexdigest()
+        if self._latest.get(url) == digest:
+            return False
+        if self._seg is None or self._seg.tell() >= self.segment_bytes:
+            self._roll()
+        now = time.time()
+        head = (
+            "WARC/1.1\r\n"
+            "WARC-Type: resource\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now))}\r\n"
+            f"WARC-Payload-Digest: sha256:{digest}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("utf-8")
+        member = gzip.compress(head + body + b"\r\n\r\n", self.compresslevel)
+        offset = self._seg.tell()
+        self._seg.write(member)
+        self._idx.write(f"{url}\t{offset}\t{len(member)}\t{digest}\t{now:.3f}\n")
+        self._latest[url] = digest
+        self.appended += 1
+        return True
+
+    def flush(self) -> None:
+        for f in (self._seg, self._idx):
+            if f:
+                f.flush()
+
+    def close(self) -> None:
+        self._close_segment()
+
+
+class ArchiveReader:
+    """URL lookups against an archive; safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        self.index = load_index(path)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, url: str) -> bytes | None:
+        entry = self.index.get(url)
+        return read_entry(self.path, entry) if entry else None
@@ -0,0 +1,152 @@
+"""
+Exact and near-duplicate page detection
+---------------------------------------
+Many salzburg.info URLs (language switches, tracking parameters, list pages)
+serve the same HTML. scrape_sc.py fingerprints every fetched body before it is
+handed to the extractors and skips pages it has already seen in this crawl:
+
+- exact:  sha256 of the body after dropping comments, nonces/CSRF tokens and
+          collapsing whitespace.
+- near:   64-bit SimHash over word 3-shingles of the visible text; two pages
+          whose SimHashes differ in at most `near_distance` bits are treated
+          as duplicates (off by default: pages with a large shared layout and
+          little unique text can collide).
+
+  fp = Fingerprinter(near_distance=3)
+  fp.check(url, body)   # None the first time, Duplicate(...) for repeats
+
+Hashing is the expensive part (milliseconds for a SimHash of a large page),
+so a caller on an event loop computes fingerprint(body, near) in an executor
+and only runs fp.check_fingerprint(url, ...) on the loop.
+"""
+
+import hashlib
+import re
+from typing import NamedTuple
+
+_COMMENT_RE = re.compile(rb"<!--.*?-->", re.S)
+# per-request values that change on every response without changing content
+_VOLATILE_ATTRS = (b"nonce", b"data-csrf", b"data-request-id")
+_VOLATILE_RE = re.compile(
+    rb"""\s(?:nonce|data-csrf[\w-]*|data-request-id)\s*=\s*(?:"[^"]*"|'[^']*')"""
+)
+_CSRF_META_RE = re.compile(rb"""<meta[^>]+name=["']csrf[^>]*>""", re.I)
+_SKIP_BLOCK_RE = re.compile(rb"<(script|style|noscript)\b.*?</\1\s*>", re.S | re.I)
+_TAG_RE = re.compile(rb"<[^>]+>")
+_WORD_RE = re.compile(r"\w+")
+
+
+class Duplicate(NamedTuple):
+    canonical: str  # first URL seen with this content
+    kind: str  # "exact" or "near"
+    distance: int  # SimHash bit distance (0 for exact)
+
+
+def normalize_body(body: bytes) -> bytes:
+    body = _COMMENT_RE.sub(b"", body)
+    body = _CSRF_META_RE.sub(b"", body)
+    # the substring scans are far cheaper than running the regex blindly
+    if any(a in body for a in _VOLATILE_ATTRS):
+        body = _VOLATILE_RE.sub(b"", body)
+    return b" ".join(body.split())
+
+
+def body_hash(body: bytes) -> str:
+    return hashlib.sha256(normalize_body(body)).hexdigest()
+
+
+def visible_words(body: bytes) -> list[str]:
+    text = _TAG_RE.sub(b" ", _SKIP_BLOCK_RE.sub(b" ", body))
+    return _WORD_RE.findall(text.decode("utf-8", errors="replace").lower())
+
+
+def simhash(body: bytes, shingle: int = 3) -> int:
+    """64-bit SimHash of the page's distinct word shingles."""
+    words = visible_words(body)
+    if len(words) < shingle:
+        features = {" ".join(words)}
+    else:
+        features = {
+            " ".join(words[i : i + shingle]) for i in range(len(words) - shingle + 1)
+        }
+    n = len(features)
+    # one 64-char bit string per feature, concatenated; column i is every
+    # 64th character, so the per-bit counts are 64 C-level slice+count calls
+    bits = "".join(
+        format(
+            int.from_bytes(
+                hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big"
+            ),
+            "064b",
+        )
+        for f in features
+    )
+    h = 0
+    for i in range(64):
+        if 2 * bits[i::64].count("1") > n:
+            h |= 1 << (63 - i)
+    return h
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def fingerprint(body: bytes, near: bool = False) -> tuple[str, int | None]:
+    """(exact digest, SimHash or None) of a page; safe to run in any thread."""
+    return body_hash(body), simhash(body) if near else None
+
+
+class Fingerprinter:
+    """
+    Remembers the pages of one crawl. Not thread-safe; the crawler calls it
+    from its event loop only.
+    """
+
+    def __init__(self, near_distance: int = 0):
+        self.near_distance = max(0, near_distance)
+        self._exact: dict[str, str] = {}
+        # SimHash split into near_distance+1 bands: two hashes within
+        # near_distance bits agree on at least one band (pigeonhole)
+        n_bands = self.near_distance + 1
+        width = 64 // n_bands
+        self._bands = [
+            (i * width, 64 if i == n_bands - 1 else (i + 1) * width)
+            for i in range(n_bands)
+        ]
+        self._index: list[dict[int, list[tuple[int, str]]]] = [{} for _ in self._bands]
+
+    def _band_keys(self, h: int):
+        for lo, hi in self._bands:
+            yield (h >> lo) & ((1 << (hi - lo)) - 1)
+
+    def check(self, url: str, body: bytes) -> Duplicate | None:
+        """Duplicate of an earlier page, or None (and remember this one)."""
+        return self.check_fingerprint(
+            url, *fingerprint(body, near=bool(self.near_distance))
+        )
+
+    def check_fingerprint(
+        self, url: str, digest: str, h: int | None = None
+    ) -> Duplicate | None:
+        """check() for a page whose fingerprint() is already known."""
+        canonical = self._exact.get(digest)
+        if canonical is not None and canonical != url:
+            return Duplicate(canonical, "exact", 0)
+        self._exact.setdefault(digest, url)
+        if not self.near_distance or h is None:
+            return None
+
+        keys = list(self._band_keys(h))
+        best = None
+        for index, key in zip(self._index, keys):
+            for other, other_url in index.get(key, ()):
+                d = hamming(h, other)
+                if d <= self.near_distance and other_url != url:
+                    if best is None or d < best.distance:
+                        best = Duplicate(other_url, "near", d)
+        if best:
+            return best
+        for index, key in zip(self._index, keys):
+            index.setdefault(key, []).append((h, url))
+        return None
@@ -0,0 +1,160 @@
+"""
+Per-host token-bucket rate limiting
+-----------------------------------
+Shared by the crawler and the enricher. Each host gets its own bucket that
+refills at `rate` requests/second and holds at most `burst` tokens, so several
+requests can be in flight without exceeding the request rate the old fixed
+`time.sleep(delay)` loop allowed.
+
+Buckets hand out reservations: a caller takes a token immediately and is told
+how long to wait before using it. That keeps the limiter usable from threads
+(`acquire`) as well as from asyncio code (`acquire_async`). A bucket can be
+paused (e.g. for a server's Retry-After), which holds every reservation until
+the pause ends.
+
+`AdaptiveConcurrency` is the crawler's AIMD controller for the number of
+requests in flight: it grows while responses stay fast and halves on
+throttling (429/5xx), so the crawl settles near the rate the server tolerates.
+"""
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate  # tokens per second; <= 0 disables limiting
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            pause = max(0.0, self.paused_until - now)
+            if self.rate <= 0:
+                return pause
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1.0
+            if self.tokens >= 0:
+                return pause
+            # tokens may go negative: later callers queue up behind earlier ones
+            return pause + -self.tokens / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Hold all reservations for `seconds` (extends, never shortens)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """One TokenBucket per host (scheme://netloc)."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        parsed = urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return b
+
+    def pause(self, url: str, seconds: float) -> None:
+        """Stop issuing requests to the host of `url` for `seconds`."""
+        if seconds > 0:
+            self.bucket(url).pause(seconds)
+
+    def acquire(self, url: str) -> None:
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, url: str) -> None:
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on requests in flight, for use from one event loop.
+
+    Every healthy response (latency within `latency_tolerance` x the best
+    recent latency) raises the limit by 1/limit, i.e. by one per round of
+    responses. A throttling signal (429/5xx, transport error) halves it, at
+    most once per `cooldown` seconds so one burst of errors counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 64,
+        latency_tolerance: float = 2.0,
+        cooldown: float = 1.0,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.peak = 0  # most requests that were in flight at once
+        self.base_latency: float | None = None
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        # slowly decaying minimum, so the baseline follows a slower server
+        if self.base_latency is None:
+            self.base_latency = latency
+        else:
+            self.base_latency = min(latency, self.base_latency * 1.01)
+        if latency <= self.base_latency * self.latency_tolerance:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_throttle(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit / 2)
+            self._last_decrease = now
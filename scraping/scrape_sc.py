@@ -14,16 +14,61 @@ FOCUS
 USAGE
   python salzburg_crawler.py --root https://www.salzburg.info \
       --out salzburg_events_attractions.json \
-      --delay 0.6 --max 10000
+      --delay 0.6 --concurrency 8 --max 10000
 
 Options
   --root        Root site (default: https://www.salzburg.info)
   --out         Output JSON path
-  --delay       Delay between requests (seconds) [default 0.6]
+  --delay       Min. seconds between requests to one host [default 0.6]
+  --rate        Max requests/second per host (overrides --delay)
+  --burst       Per-host token-bucket burst size [default 1]
+  --concurrency Requests kept in flight on pooled keep-alive connections at the
+                start; grows while responses stay fast and halves on 429/5xx
+                (AIMD) [default 4]
+  --max-concurrency  Upper bound for the adaptive concurrency; 0 turns AIMD
+                off and keeps exactly --concurrency requests in flight
+                [default 16]
+  --retries     Retries per URL after 429/5xx or connection errors, honouring
+                Retry-After (the host is paused meanwhile) [default 4]
+  --backoff     Base seconds of the jittered exponential backoff [default 1.0]
+  --workers     Extractor processes fed from the fetchers through a bounded
+                queue (0 = extract in-process) [default: CPU count]
   --max         Max pages to fetch from sitemap (0 = no limit) [default 0]
   --fallback    Also try HTML heuristics for attraction pages without JSON-LD
   --include     Extra URL substring filters (comma-separated), applied in addition to defaults
   --exclude     URL substrings to skip (comma-separated)
+  --cache       On-disk HTTP cache shared with enrich.py [default .http_cache.sqlite]
+  --no-cache    Always download pages in full
+  --cache-max-age  Serve cached pages younger than N seconds without revalidating
+  --state       Crawl-state database [default .crawl_state.sqlite]
+  --ndjson      Streaming record log [default: --out with .ndjson extension]
+  --checkpoint-every  Pages between fsynced progress checkpoints [default 50]
+  --resume      Continue an interrupted crawl: skip pages finished before the
+                last checkpoint and keep appending to the NDJSON log
+  --sitemap-workers  Child sitemaps fetched/parsed in parallel [default 8]
+  --page-dedup  Skip a page whose normalised body matches one already fetched
+                in this crawl: it is written without records and recorded as
+                a duplicate in the crawl state. Which of the duplicate URLs
+                keeps the records depends on fetch order, so the output can
+                differ between runs [default off: extract every page]
+  --near-dup    Also skip near-duplicates: SimHash within N bits (implies
+                --page-dedup) [default 0 = off]
+  --prune-duplicates  Do not fetch URLs earlier crawls recorded as duplicates
+  --archive     Directory of the append-only page archive: every fetched page
+                body goes into gzip'd WARC segments with an offset index
+                [default .page_archive]
+  --no-archive  Do not archive fetched pages
+  --reextract   No crawling: run the current extractors over the latest
+                archived copy of every page, in parallel (--workers), and
+                write --out as usual
+  --stats-file  Write a JSON metrics snapshot (per-stage latency histograms,
+                responses per status, pages/records per URL pattern) here
+  --stats-interval  Seconds between --stats-file snapshots [default 10]
+  --metrics-port  Serve live metrics on 127.0.0.1:PORT (/metrics Prometheus
+                text, /stats JSON)
+  --incremental Fetch only URLs that are new or whose sitemap <lastmod> changed
+                (or whose <changefreq> interval elapsed) and merge the results
+                into the existing --out file
 
 OUTPUT SCHEMA (lean, generic)
 {
@@ -45,16 +90,49 @@ OUTPUT SCHEMA (lean, generic)
 """
 
 import argparse
+import asyncio
+import functools
+import gzip
+import io
+import itertools
 import json
+import os
+import queue
+import random
 import re
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from xml.etree import ElementTree as ET
 from urllib.parse import urlparse, urljoin
 
+import orjson
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
+from crawl_metrics import (
+    COUNT_BUCKETS,
+    FETCH_BUCKETS,
+    Metrics,
+    serve_metrics,
+    start_stats_writer,
+    timed_adapter,
+)
+from crawl_state import DEFAULT_STATE_PATH, CrawlState, SitemapEntry, content_hash
+from http_cache import DEFAULT_CACHE_PATH, HttpCache, cached_get
+from ndjson_sink import RecordSink, compact_ndjson
+from page_archive import (
+    DEFAULT_ARCHIVE_PATH,
+    PageArchive,
+    by_segment,
+    iter_segment,
+    load_index,
+)
+from page_fingerprint import Fingerprinter, fingerprint
+from ratelimit import AdaptiveConcurrency, HostRateLimiter, parse_retry_after
+
 DEFAULT_ROOT = "https://www.salzburg.info"
 
 HEADERS = {
@@ -137,14 +215,37 @@ def pick_category_from_type(types) -> str | None:
     return None
 
 
-def parse_jsonld(soup: BeautifulSoup, base_url: str):
+# <script type="application/ld+json">…</script> blocks, matched on raw bytes
+JSONLD_SCRIPT_RE = re.compile(
+    rb"<script\b[^>]*?\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def iter_jsonld_blocks(html: bytes | str):
+    """Yield the raw text of each JSON-LD script block without building a DOM."""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    for m in JSONLD_SCRIPT_RE.finditer(html):
+        txt = m.group(1).strip()
+        if txt:
+            yield txt
+
+
+def decode_jsonld(txt: bytes):
+    try:
+        return orjson.loads(txt)
+    except orjson.JSONDecodeError:
+        pass
+    # orjson only takes strict UTF-8 JSON; retry leniently (NaN, odd encodings)
+    return json.loads(txt.decode("utf-8", errors="replace"))
+
+
+def parse_jsonld(html: bytes | str, base_url: str):
     nodes = []
-    for tag in soup.select('script[type="application/ld+json"]'):
-        txt = tag.string or tag.text or ""
-        if not txt.strip():
-            continue
+    for txt in iter_jsonld_blocks(html):
         try:
-            data = json.loads(txt)
+            data = decode_jsonld(txt)
         except Exception:
             continue
         if isinstance(data, list):
@@ -298,21 +399,127 @@ def extract_fallback_attraction(soup: BeautifulSoup, base_url: str):
     }
 
 
-def fetch(session: requests.Session, url: str, timeout=25) -> str | None:
-    r = session.get(url, headers=HEADERS, timeout=timeout)
+# answers that mean "try again later" rather than "no such page"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RetryableStatus(requests.RequestException):
+    """A 429/5xx response; `retry_after` is the server's hint in seconds."""
+
+    def __init__(self, url: str, status: int, retry_after: float | None = None):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def fetch(
+    session: requests.Session,
+    url: str,
+    timeout=25,
+    cache: HttpCache | None = None,
+    metrics: Metrics | None = None,
+) -> bytes | None:
+    """
+    Raw response body (undecoded), or None for HTTP errors. Raises
+    RetryableStatus for 429/5xx so callers can back off and retry.
+    """
+    t0 = time.perf_counter()
+    r = cached_get(session, url, cache, headers=HEADERS, timeout=timeout)
+    if metrics:
+        record_response(metrics, r, time.perf_counter() - t0)
+    if r.status_code in RETRY_STATUSES:
+        raise RetryableStatus(url, r.status_code, parse_retry_after(r.retry_after))
     if r.status_code >= 400:
         return None
-    return r.text
+    return r.content
+
+
+def record_response(metrics: Metrics, r, total: float) -> None:
+    """Status, byte and ttfb/transfer metrics for one cached_get() result."""
+    if r.from_cache and not r.revalidated:
+        metrics.inc("http_responses_total", status="cache")
+        return
+    status = 304 if r.revalidated else r.status_code
+    metrics.inc("http_responses_total", status=status)
+    metrics.observe("stage_seconds", r.elapsed, stage="ttfb")
+    if not r.revalidated:
+        metrics.observe("stage_seconds", max(0.0, total - r.elapsed), stage="transfer")
+        metrics.inc("bytes_received_total", len(r.content))
+
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_sitemap_url(u: str) -> bool:
+    return u.endswith(".xml") or u.endswith(".xml.gz")
+
+
+def parse_sitemap_stream(session: requests.Session, sm_url: str):
+    """
+    Stream one sitemap and yield ("sitemap", loc) for index children and
+    ("page", SitemapEntry) for urlset entries. The body is parsed with
+    iterparse straight off the socket; gzip is unwrapped transparently
+    (Content-Encoding or a .xml.gz body).
+    """
+    r = session.get(sm_url, headers=HEADERS, timeout=25, stream=True)
+    with r:
+        if r.status_code >= 400:
+            return
+        r.raw.decode_content = True
+        r.raw.auto_close = False  # let BufferedReader drain it after EOF
+        stream = io.BufferedReader(r.raw, buffer_size=64 * 1024)
+        if stream.peek(2)[:2] == GZIP_MAGIC:
+            stream = gzip.GzipFile(fileobj=stream)
+        root = None
+        for event, el in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = el
+                continue
+            if el.tag == SITEMAP_NS + "sitemap":
+                loc = el.findtext(SITEMAP_NS + "loc")
+                if loc:
+                    yield "sitemap", loc.strip()
+            elif el.tag == SITEMAP_NS + "url":
+                loc = (el.findtext(SITEMAP_NS + "loc") or "").strip()
+                if is_sitemap_url(loc):
+                    yield "sitemap", loc
+                elif loc:
+                    yield (
+                        "page",
+                        SitemapEntry(
+                            loc,
+                            (el.findtext(SITEMAP_NS + "lastmod") or "").strip() or None,
+                            (el.findtext(SITEMAP_NS + "changefreq") or "").strip()
+                            or None,
+                        ),
+                    )
+            else:
+                continue
+            # drop finished <url>/<sitemap> elements to keep memory flat
+            root.clear()
 
 
-def read_sitemaps(session: requests.Session, root: str) -> list[str]:
+def iter_sitemaps(
+    session: requests.Session,
+    root: str,
+    cache: HttpCache | None = None,
+    workers: int = 8,
+):
+    """
+    Lazily yield SitemapEntry for every page URL reachable from robots.txt
+    (or /sitemap.xml). Child sitemaps are fetched in parallel on `workers`
+    threads, and entries are yielded as soon as they are parsed, so filtering
+    and crawling can start before discovery finishes.
+    """
     # Try robots.txt for Sitemap entries
     robots_url = urljoin(root, "/robots.txt")
     urls = set()
     try:
-        txt = fetch(session, robots_url)
-        if txt:
-            for line in txt.splitlines():
+        body = fetch(session, robots_url, cache=cache)
+        if body:
+            for line in body.decode("utf-8", errors="replace").splitlines():
                 if line.lower().startswith("sitemap:"):
                     sm = line.split(":", 1)[1].strip()
                     urls.add(sm)
@@ -321,61 +528,716 @@ def read_sitemaps(session: requests.Session, root: str) -> list[str]:
     if not urls:
         urls.add(urljoin(root, "/sitemap.xml"))
 
-    # parse sitemap(s), following indexes
-    def parse_sm(sm_url):
-        xml = fetch(session, sm_url)
-        if not xml:
-            return []
+    results: queue.Queue = queue.Queue(maxsize=10_000)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def scan(sm_url):
         try:
-            tree = ET.fromstring(xml.encode("utf-8") if isinstance(xml, str) else xml)
+            for item in parse_sitemap_stream(session, sm_url):
+                if stop.is_set():
+                    break
+                put(item)
         except Exception:
-            return []
-        ns = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-        locs = []
-        if tree.tag.endswith("sitemapindex"):
-            for el in tree.findall(".//sm:sitemap/sm:loc", ns):
-                locs.append(el.text.strip())
-        else:
-            for el in tree.findall(".//sm:url/sm:loc", ns):
-                locs.append(el.text.strip())
-        return locs
+            pass
+        finally:
+            put(done)
 
-    queue = list(urls)
-    pages = []
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
     seen = set()
-    while queue:
-        sm = queue.pop(0)
-        if sm in seen:
-            continue
-        seen.add(sm)
-        locs = parse_sm(sm)
-        for loc in locs:
-            if loc.endswith(".xml"):
-                queue.append(loc)
+    pending = 0
+    try:
+        for sm in urls:
+            seen.add(sm)
+            executor.submit(scan, sm)
+            pending += 1
+        while pending:
+            item = results.get()
+            if item is done:
+                pending -= 1
+                continue
+            kind, value = item
+            if kind == "sitemap":
+                if value not in seen:
+                    seen.add(value)
+                    executor.submit(scan, value)
+                    pending += 1
             else:
-                pages.append(loc)
-    return pages
+                yield value
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _substring_regex(patterns: list[str]):
+    """One compiled alternation matching any of the literal substrings."""
+    pats = sorted({p for p in patterns if p}, key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, pats))) if pats else None
+
+
+class UrlMatcher:
+    """
+    Domain + include/exclude substring filters, compiled once.
+
+    Exclude and include patterns each become a single regex alternation, so a
+    URL is scanned once per list instead of once per pattern, and the domain
+    check is a prefix comparison instead of a urlparse() per URL.
+    """
+
+    def __init__(
+        self, domain: str, include_filters: list[str], exclude_filters: list[str]
+    ):
+        self.domain = domain
+        self._domain_lower = domain.lower()
+        self._include = _substring_regex(include_filters)
+        self._exclude = _substring_regex(exclude_filters)
+
+    def same_origin(self, u: str) -> bool:
+        d = self.domain
+        if u.startswith(d):
+            # next char must end the netloc ("…info:8080" / "…info.evil" differ)
+            return len(u) == len(d) or u[len(d)] in "/?#"
+        if u[: len(d)].lower() != self._domain_lower:
+            return False
+        # rare: differently-cased scheme etc.; fall back to a real parse
+        parsed = urlparse(u)
+        return f"{parsed.scheme}://{parsed.netloc}" == d
+
+    def include_match(self, u: str) -> str | None:
+        """The include pattern that matched `u` (None if none did)."""
+        if self._include is None:
+            return None
+        m = self._include.search(u)
+        return m.group(0) if m else None
+
+    def allowed(self, u: str) -> bool:
+        if not self.same_origin(u):
+            return False
+        if self._exclude is not None and self._exclude.search(u):
+            return False
+        # At least one include filter should match
+        if self._include is not None and not self._include.search(u):
+            return False
+        return True
+
+    def filter_urls(self, items, key=None):
+        """Lazily yield the items of `items` whose URL (or key(item)) is allowed."""
+        allowed = self.allowed
+        if key is None:
+            return (u for u in items if allowed(u))
+        return (it for it in items if allowed(key(it)))
+
+
+@functools.lru_cache(maxsize=32)
+def _matcher(domain: str, include: tuple, exclude: tuple) -> UrlMatcher:
+    return UrlMatcher(domain, list(include), list(exclude))
 
 
 def url_allowed(
     u: str, domain: str, include_filters: list[str], exclude_filters: list[str]
 ) -> bool:
-    parsed = urlparse(u)
-    if f"{parsed.scheme}://{parsed.netloc}" != domain:
-        return False
-    if any(ex in u for ex in exclude_filters):
-        return False
-    # At least one include filter should match
-    if include_filters and not any(inc in u for inc in include_filters):
-        return False
-    return True
+    return _matcher(domain, tuple(include_filters), tuple(exclude_filters)).allowed(u)
+
+
+def build_record(data: dict, cat: str | None, url: str) -> dict:
+    return {
+        "id": slug_from_url(data.get("url") or url),
+        "name": data.get("name"),
+        "category": cat,
+        "url": data.get("url") or url,
+        "start_date": data.get("start_date") if cat == "event" else None,
+        "end_date": data.get("end_date") if cat == "event" else None,
+        "summary": data.get("summary"),
+        "address": data.get("address"),
+        "geo": data.get("geo"),
+        "opening_hours": data.get("opening_hours"),
+        "price": data.get("price"),
+        "tags": data.get("tags") or [],
+        "images": data.get("images") or [],
+        "source_url": url,
+    }
+
+
+def extract_records(
+    url: str, html: bytes | str, fallback: bool, timings: dict | None = None
+) -> list[dict]:
+    """
+    Turn one fetched page into zero or more output records. JSON-LD is read
+    straight from the raw HTML; the BeautifulSoup tree is only built when the
+    fallback heuristics actually run. Seconds spent in the "jsonld" and
+    "html_parse" steps are added to `timings` when given.
+    """
+    t0 = time.perf_counter()
+    jsonld_nodes = parse_jsonld(html, url)
+    if timings is not None:
+        timings["jsonld"] = time.perf_counter() - t0
+
+    # Prefer nodes with types we care about
+    picked = []
+    for n in jsonld_nodes:
+        t = n.get("@type")
+        types = {t} if isinstance(t, str) else set(t or [])
+        if types & PREFERRED_TYPES:
+            picked.append(n)
+
+    if not picked and fallback and ("/sehenswertes" in url or "/sightseeing" in url):
+        # try heuristic attraction extraction
+        t0 = time.perf_counter()
+        soup = BeautifulSoup(html, "lxml")
+        if timings is not None:
+            timings["html_parse"] = time.perf_counter() - t0
+        rec = extract_fallback_attraction(soup, url)
+        if not rec.get("name"):
+            return []
+        return [build_record(rec, "attraction", url)]
+
+    records = []
+    for n in picked:
+        cat = pick_category_from_type(n.get("@type"))
+        if cat == "event":
+            data = extract_event_from_jsonld(n)
+        else:
+            data = extract_attraction_from_jsonld(n)
+        records.append(build_record(data, cat, url))
+    return records
+
+
+def score(r: dict) -> int:
+    return (
+        (1 if r.get("geo") else 0)
+        + (1 if r.get("images") else 0)
+        + (1 if r.get("summary") else 0)
+        + (1 if r.get("start_date") else 0)
+    )
+
+
+# ---- async crawl engine ----------------------------------------------------
+
+
+def make_session(pool_size: int, metrics: Metrics | None = None) -> requests.Session:
+    """
+    Session whose connection pool keeps one keep-alive socket per worker.
+    With `metrics`, new connections report their connect time.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    if metrics:
+        adapter = timed_adapter(
+            metrics, pool_connections=pool_size, pool_maxsize=pool_size
+        )
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+async def crawl_pages(
+    session: requests.Session,
+    urls,
+    limiter: HostRateLimiter,
+    concurrency: int,
+    cache: HttpCache | None = None,
+    metrics: Metrics | None = None,
+    max_concurrency: int = 0,
+    retries: int = 4,
+    backoff: float = 1.0,
+):
+    """
+    Fetch `urls` and yield (url, html|None) as responses complete. Requests
+    run on a thread pool that shares `session`, so every worker reuses a
+    pooled keep-alive connection; the per-host limiter decides when each
+    request may start.
+
+    The number of requests in flight starts at `concurrency` and adapts up to
+    `max_concurrency` (AIMD, see AdaptiveConcurrency); with `max_concurrency`
+    0 it stays at `concurrency`. 429/5xx responses and connection errors
+    halve an adaptive limit and are requeued up to `retries` times after a
+    jittered exponential backoff (`backoff` x 2^attempt seconds), or after the
+    server's Retry-After if that is longer; Retry-After also pauses the host's
+    bucket so no other request goes out meanwhile.
+    """
+    loop = asyncio.get_running_loop()
+    if max_concurrency > 0:
+        max_concurrency = max(concurrency, max_concurrency)
+        control = AdaptiveConcurrency(concurrency, maximum=max_concurrency)
+    else:
+        # fixed: minimum == maximum, so neither AIMD step moves the limit
+        max_concurrency = concurrency
+        control = AdaptiveConcurrency(concurrency, concurrency, concurrency)
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    todo: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency * 2)
+    done: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency * 2)
+    # URLs handed out by the producer and not yet answered for good
+    outstanding = 0
+    producer_done = False
+    finished = asyncio.Event()
+    retry_tasks = set()
+
+    def fetch_timed(url):
+        t0 = time.perf_counter()
+        body = fetch(session, url, cache=cache, metrics=metrics)
+        return body, time.perf_counter() - t0
+
+    def settle():
+        nonlocal outstanding
+        outstanding -= 1
+        if producer_done and not outstanding:
+            finished.set()
+
+    async def producer():
+        # `urls` may be a lazy iterator that blocks on sitemap discovery,
+        # so pull from it off the event loop
+        nonlocal outstanding, producer_done
+        seen = set()
+        it = iter(urls)
+        while True:
+            url = await loop.run_in_executor(None, next, it, None)
+            if url is None:
+                break
+            if url in seen:
+                continue
+            seen.add(url)
+            outstanding += 1
+            await todo.put((url, 0))
+        producer_done = True
+        if not outstanding:
+            finished.set()
+
+    async def requeue(url, attempt, delay):
+        await asyncio.sleep(delay)
+        await todo.put((url, attempt))
+
+    async def worker():
+        while True:
+            item = await todo.get()
+            if item is None:
+                break
+            url, attempt = item
+            await control.acquire()
+            try:
+                await limiter.acquire_async(url)
+                t0 = time.perf_counter()
+                try:
+                    html, secs = await loop.run_in_executor(executor, fetch_timed, url)
+                finally:
+                    # includes thread pool queueing and event loop delays
+                    if metrics:
+                        metrics.observe(
+                            "fetch_seconds", time.perf_counter() - t0, FETCH_BUCKETS
+                        )
+                control.on_success(secs)
+            except (RetryableStatus, requests.ConnectionError, requests.Timeout) as e:
+                control.on_throttle()
+                if metrics and not isinstance(e, RetryableStatus):
+                    metrics.inc("http_responses_total", status="error")
+                if attempt >= retries:
+                    tqdm.write(f"giving up on {url}: {e}")
+                    if metrics:
+                        metrics.inc("retries_exhausted_total")
+                    html = None
+                else:
+                    retry_after = getattr(e, "retry_after", None) or 0.0
+                    limiter.pause(url, retry_after)
+                    cap = backoff * 2**attempt
+                    delay = max(retry_after, cap / 2 + random.uniform(0, cap / 2))
+                    if metrics:
+                        metrics.inc("retries_total")
+                    task = asyncio.create_task(requeue(url, attempt + 1, delay))
+                    retry_tasks.add(task)
+                    task.add_done_callback(retry_tasks.discard)
+                    continue
+            except Exception as e:
+                tqdm.write(f"fetch failed for {url}: {e!r}")
+                if metrics:
+                    metrics.inc("http_responses_total", status="error")
+                html = None
+            finally:
+                await control.release()
+                if metrics:
+                    metrics.set("concurrency_limit", int(control.limit))
+                    metrics.set("in_flight_peak", control.peak)
+            await done.put((url, html))
+            settle()
+
+    async def supervise():
+        workers = [asyncio.create_task(worker()) for _ in range(max_concurrency)]
+        try:
+            await producer()
+            await finished.wait()
+            for _ in workers:
+                await todo.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for t in (*workers, *retry_tasks):
+                t.cancel()
+        await done.put(None)
+
+    task = asyncio.create_task(supervise())
+    try:
+        while True:
+            item = await done.get()
+            if item is None:
+                break
+            yield item
+        await task
+    finally:
+        task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fingerprint_timed(html: bytes, near: bool) -> tuple[tuple, float]:
+    """Extractor-process (or thread) entry point: fingerprint plus seconds."""
+    t0 = time.perf_counter()
+    fp = fingerprint(html, near)
+    return fp, time.perf_counter() - t0
+
+
+def extract_timed(url: str, html: bytes, fallback: bool) -> tuple[list[dict], dict]:
+    """Extractor-process entry point: records plus per-step seconds."""
+    timings = {}
+    t0 = time.perf_counter()
+    records = extract_records(url, html, fallback, timings)
+    timings["extract"] = time.perf_counter() - t0
+    return records, timings
+
+
+def print_report(metrics: Metrics, wall: float, workers: int) -> None:
+    """Human-readable summary of the crawl metrics."""
+    snap = metrics.snapshot()
+    print(f"Pipeline ({wall:.1f}s wall, {workers} extractor processes):")
+    for key, h in snap["histograms"].get("stage_seconds", {}).items():
+        stage = key.split("=", 1)[1]
+        print(
+            f"  {stage:<10} {h['count']:>7}  total {h['sum']:8.2f}s"
+            f"  p50 <={h['p50'] * 1000:g}ms  p99 <={h['p99'] * 1000:g}ms"
+        )
+    statuses = snap["counters"].get("http_responses_total", {})
+    if statuses:
+        print(
+            "  responses  "
+            + "  ".join(
+                f"{k.split('=', 1)[1]}:{int(v)}" for k, v in sorted(statuses.items())
+            )
+        )
+    _, received = metrics.total("bytes_received_total")
+    _, pages = metrics.total("pages_fetched_total")
+    rate = pages / wall if wall > 0 else 0.0
+    print(f"  fetched    {int(pages)} pages ({rate:.1f}/s), {int(received)} bytes")
+    _, retried = metrics.total("retries_total")
+    _, gave_up = metrics.total("retries_exhausted_total")
+    dups = snap["counters"].get("duplicate_pages_total", {})
+    if dups:
+        print(
+            "  duplicates "
+            + "  ".join(
+                f"{k.split('=', 1)[1]}:{int(v)}" for k, v in sorted(dups.items())
+            )
+            + " (not extracted)"
+        )
+    limit = snap["gauges"].get("concurrency_limit", {}).get("", 0)
+    print(
+        f"  retries    {int(retried)} ({int(gave_up)} URLs given up),"
+        f" final concurrency {int(limit)}"
+    )
+
+
+async def crawl(
+    args,
+    session,
+    entries,
+    limiter,
+    cache,
+    state,
+    previous,
+    sink: RecordSink,
+    matcher: UrlMatcher,
+    metrics: Metrics,
+    archive: PageArchive | None = None,
+) -> set[str]:
+    """
+    Crawl pipeline: fetchers -> extractors -> writer.
+
+    Pages come off `crawl_pages` and are handed to a ProcessPoolExecutor of
+    `args.workers` extractor processes (in-process when 0), which also
+    computes the page fingerprints (a thread when 0), so the event loop only
+    does the index lookups. At most 4 x workers pages are past the fetch loop;
+    when that is full it stops pulling responses, which in turn stalls the
+    fetchers (backpressure). A single writer coroutine appends results to
+    `sink` and the crawl state. Pages whose HTML hash matches the crawl state
+    reuse their records from `previous` (source_url -> records) instead of
+    being re-extracted. With --page-dedup, pages whose body duplicates one
+    fetched earlier in this crawl (see page_fingerprint) are not extracted;
+    they are written with no records and listed in the state's duplicates
+    table. Every other fetched body is appended to `archive` (if it changed) by a single
+    archiver thread. Every stage reports into `metrics`, pages and records
+    labelled with the include pattern (`matcher`) their URL matched. Returns
+    the set of URLs that were fetched successfully.
+    """
+    loop = asyncio.get_running_loop()
+    by_url = {}
+
+    def urls():
+        for e in entries:
+            by_url[e.loc] = e
+            yield e.loc
+
+    pool = ProcessPoolExecutor(args.workers) if args.workers > 0 else None
+    slots = asyncio.Semaphore(max(1, args.workers) * 4)
+    results: asyncio.Queue = asyncio.Queue(maxsize=max(1, args.workers) * 4)
+
+    def pattern(url):
+        return matcher.include_match(url) or "other"
+
+    dedup = args.page_dedup or args.near_dup > 0
+    fingerprints = Fingerprinter(args.near_dup) if dedup else None
+    archiver = ThreadPoolExecutor(max_workers=1) if archive else None
+    fetched = set()
+    bar = tqdm(desc="Crawling", unit="page")
+
+    def archive_timed(url, html, html_hash):
+        t0 = time.perf_counter()
+        return archive.append(url, html, html_hash), time.perf_counter() - t0
+
+    async def extract(url, html, html_hash):
+        records = []
+        try:
+            if pool:
+                records, timings = await loop.run_in_executor(
+                    pool, extract_timed, url, html, args.fallback
+                )
+            else:
+                records, timings = extract_timed(url, html, args.fallback)
+            for stage, secs in timings.items():
+                metrics.observe("stage_seconds", secs, stage=stage)
+        except Exception as e:
+            tqdm.write(f"extract failed for {url}: {e!r}")
+        await results.put((url, html_hash, records, None))
+
+    async def process(url, html):
+        try:
+            html_hash = content_hash(html)
+            dup = None
+            if fingerprints:
+                try:
+                    (digest, h), secs = await loop.run_in_executor(
+                        pool, fingerprint_timed, html, bool(fingerprints.near_distance)
+                    )
+                    metrics.observe("stage_seconds", secs, stage="fingerprint")
+                    dup = fingerprints.check_fingerprint(url, digest, h)
+                except Exception as e:
+                    tqdm.write(f"fingerprint failed for {url}: {e!r}")
+            if dup:
+                metrics.inc("duplicate_pages_total", kind=dup.kind)
+                await results.put((url, html_hash, [], dup))
+                return
+            if archive:
+                try:
+                    appended, secs = await loop.run_in_executor(
+                        archiver, archive_timed, url, html, html_hash
+                    )
+                    if appended:
+                        metrics.inc("archived_pages_total")
+                    metrics.observe("stage_seconds", secs, stage="archive")
+                except Exception as e:
+                    tqdm.write(f"archive failed for {url}: {e!r}")
+            prev = state.get(url) if state else None
+            if prev and prev.content_hash == html_hash and url in previous:
+                await results.put((url, html_hash, previous[url], None))
+                return
+            await extract(url, html, html_hash)
+        finally:
+            slots.release()
+
+    async def writer():
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            url, html_hash, records, dup = item
+            t0 = time.perf_counter()
+            sink.write_page(url, records)
+            if state:
+                state.record(by_url[url], html_hash, [r["id"] for r in records])
+                if dup:
+                    state.record_duplicate(url, *dup)
+            metrics.observe("stage_seconds", time.perf_counter() - t0, stage="write")
+            metrics.observe("records_per_page", len(records), COUNT_BUCKETS)
+            metrics.inc("records_total", len(records), pattern=pattern(url))
+            bar.update(1)
+
+    started = time.perf_counter()
+    writer_task = asyncio.create_task(writer())
+    pending = set()
+    try:
+        async for url, html in crawl_pages(
+            session,
+            urls(),
+            limiter,
+            args.concurrency,
+            cache,
+            metrics,
+            args.max_concurrency,
+            args.retries,
+            args.backoff,
+        ):
+            if not html:
+                bar.update(1)
+                continue
+            fetched.add(url)
+            metrics.inc("pages_fetched_total")
+            metrics.inc("pages_total", pattern=pattern(url))
+            await slots.acquire()
+            task = asyncio.create_task(process(url, html))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+        await results.put(None)
+        await writer_task
+    finally:
+        writer_task.cancel()
+        bar.close()
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        if archiver:
+            # the caller closes the archive; let queued appends finish first
+            archiver.shutdown(wait=True)
+
+    print_report(metrics, time.perf_counter() - started, args.workers)
+    return fetched
+
+
+def extract_archived(
+    archive_path: str, segment: str, entries: list, fallback: bool
+) -> list[tuple[str, list[dict]]]:
+    """Extractor-process entry point for --reextract: one slice of a segment."""
+    return [
+        (url, extract_records(url, body, fallback))
+        for url, body in iter_segment(archive_path, segment, entries)
+    ]
+
+
+def reextract(args, sink: RecordSink, metrics: Metrics, chunk: int = 256) -> int:
+    """
+    Run the current extractors over the latest archived copy of every page,
+    without network access. Segments are cut into slices of `chunk` pages
+    that `args.workers` processes extract in parallel; results are written in
+    archive order. Returns the number of pages.
+    """
+    index = load_index(args.archive)
+    tasks = [
+        (segment, entries[i : i + chunk])
+        for segment, entries in by_segment(index).items()
+        for i in range(0, len(entries), chunk)
+    ]
+    print(f"Re-extracting {len(index)} archived pages ({len(tasks)} slices)...")
+    pool = ProcessPoolExecutor(args.workers) if args.workers > 0 else None
+    try:
+        if pool:
+            futures = [
+                pool.submit(extract_archived, args.archive, seg, part, args.fallback)
+                for seg, part in tasks
+            ]
+            results = (f.result() for f in futures)
+        else:
+            results = (
+                extract_archived(args.archive, seg, part, args.fallback)
+                for seg, part in tasks
+            )
+        with tqdm(total=len(index), desc="Re-extracting", unit="page") as bar:
+            for pages in results:
+                for url, records in pages:
+                    sink.write_page(url, records)
+                    metrics.inc("records_total", len(records))
+                bar.update(len(pages))
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return len(index)
+
+
+def write_output(args, ndjson_path: str, metrics: Metrics) -> int:
+    """Deduplicate the NDJSON log by URL/id into the final --out JSON array."""
+    t0 = time.perf_counter()
+    n = compact_ndjson(
+        ndjson_path, args.out, key=lambda r: r.get("id") or r.get("url"), score=score
+    )
+    metrics.observe("stage_seconds", time.perf_counter() - t0, stage="dedup")
+    metrics.inc("records_written_total", n)
+    return n
+
+
+def load_previous_output(path: str) -> dict[str, list[dict]]:
+    """Previous crawl output grouped by source_url (empty if missing)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    by_url: dict[str, list[dict]] = {}
+    for r in data if isinstance(data, list) else []:
+        by_url.setdefault(r.get("source_url") or r.get("url"), []).append(r)
+    return by_url
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--root", default=DEFAULT_ROOT)
     ap.add_argument("--out", default="salzburg_events_attractions.json")
-    ap.add_argument("--delay", type=float, default=0.6)
+    ap.add_argument(
+        "--delay",
+        type=float,
+        default=0.6,
+        help="Seconds between requests to one host (used when --rate is not set)",
+    )
+    ap.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Max requests/second per host (default: 1/--delay)",
+    )
+    ap.add_argument(
+        "--burst", type=float, default=1.0, help="Token-bucket burst size per host"
+    )
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Requests kept in flight at the start (adapts up to --max-concurrency)",
+    )
+    ap.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=16,
+        help="Upper bound for the adaptive number of requests in flight "
+        "(0 = no adaptation, keep --concurrency)",
+    )
+    ap.add_argument(
+        "--retries",
+        type=int,
+        default=4,
+        help="Retries per URL after 429/5xx or connection errors",
+    )
+    ap.add_argument(
+        "--backoff",
+        type=float,
+        default=1.0,
+        help="Base seconds of the jittered exponential retry backoff",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Extractor processes (0 = extract in the crawler process)",
+    )
     ap.add_argument(
         "--max", type=int, default=0, help="Max pages to fetch (0=no limit)"
     )
@@ -390,10 +1252,129 @@ def main():
     ap.add_argument(
         "--exclude", default="", help="Extra exclude URL substrings, comma-separated"
     )
+    ap.add_argument(
+        "--cache",
+        default=DEFAULT_CACHE_PATH,
+        help="On-disk HTTP cache shared with enrich.py (conditional GETs)",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Disable the HTTP cache")
+    ap.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=0.0,
+        help="Serve cached pages younger than this many seconds without revalidating",
+    )
+    ap.add_argument(
+        "--state",
+        default=DEFAULT_STATE_PATH,
+        help="Crawl-state database (URL -> lastmod, fetched_at, hash, record ids)",
+    )
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch new/changed URLs and merge into the existing --out file",
+    )
+    ap.add_argument(
+        "--ndjson",
+        default="",
+        help="Streaming record log (default: --out with .ndjson extension)",
+    )
+    ap.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=50,
+        help="Pages between fsynced progress checkpoints",
+    )
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted crawl from its last checkpoint",
+    )
+    ap.add_argument(
+        "--sitemap-workers",
+        type=int,
+        default=8,
+        help="Child sitemaps fetched in parallel",
+    )
+    ap.add_argument(
+        "--page-dedup",
+        action="store_true",
+        help="Skip pages whose body duplicates an earlier one in this crawl "
+        "(the first one fetched keeps the records)",
+    )
+    ap.add_argument(
+        "--near-dup",
+        type=int,
+        default=0,
+        help="Also skip pages whose SimHash is within N bits of an earlier page "
+        "(implies --page-dedup; 0 = exact duplicates only)",
+    )
+    ap.add_argument(
+        "--prune-duplicates",
+        action="store_true",
+        help="Do not fetch URLs an earlier crawl recorded as duplicates",
+    )
+    ap.add_argument(
+        "--archive",
+        default=DEFAULT_ARCHIVE_PATH,
+        help="Directory of the compressed page archive (WARC segments + index)",
+    )
+    ap.add_argument(
+        "--no-archive", action="store_true", help="Do not archive fetched pages"
+    )
+    ap.add_argument(
+        "--reextract",
+        action="store_true",
+        help="Re-run the extractors over the archive instead of crawling (offline)",
+    )
+    ap.add_argument(
+        "--stats-file",
+        default="",
+        help="Write a JSON metrics snapshot here every --stats-interval seconds",
+    )
+    ap.add_argument(
+        "--stats-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between --stats-file snapshots",
+    )
+    ap.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="Serve /metrics (Prometheus) and /stats (JSON) on this local port",
+    )
     args = ap.parse_args()
+    args.concurrency = max(1, args.concurrency)
+    if args.max_concurrency > 0:
+        args.max_concurrency = max(args.concurrency, args.max_concurrency)
+    ndjson_path = args.ndjson or os.path.splitext(args.out)[0] + ".ndjson"
 
-    session = requests.Session()
-    session.headers.update(HEADERS)
+    metrics = Metrics()
+    stop_stats = None
+    if args.stats_file:
+        stop_stats = start_stats_writer(metrics, args.stats_file, args.stats_interval)
+    if args.metrics_port:
+        serve_metrics(metrics, args.metrics_port)
+        print(f"  Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+
+    if args.reextract:
+        sink = RecordSink(ndjson_path, args.checkpoint_every)
+        reextract(args, sink, metrics)
+        sink.close()
+        n = write_output(args, ndjson_path, metrics)
+        if stop_stats:
+            stop_stats()
+        print(f"Wrote {n} records → {args.out}")
+        return
+
+    cache = None if args.no_cache else HttpCache(args.cache, args.cache_max_age)
+    state = CrawlState(args.state)
+    archive = None if args.no_archive else PageArchive(args.archive)
+
+    session = make_session(args.max_concurrency or args.concurrency, metrics)
+    rate = args.rate or (1.0 / args.delay if args.delay > 0 else 0.0)
+    limiter = HostRateLimiter(rate, args.burst)
 
     root = args.root.rstrip("/")
     domain = f"{urlparse(root).scheme}://{urlparse(root).netloc}"
@@ -405,120 +1386,88 @@ def main():
         [s.strip() for s in args.exclude.split(",") if s.strip()]
     )
 
-    print("Reading sitemaps...")
-    candidates = read_sitemaps(session, root)
-    print(f"  Sitemap URLs discovered: {len(candidates)}")
+    matcher = UrlMatcher(domain, include_filters, exclude_filters)
+    previous = load_previous_output(args.out) if args.incremental else {}
+    counts = {"discovered": 0, "filtered": 0, "todo": 0, "pruned": 0}
+    live = set()
+    known_duplicates = state.duplicate_urls() if args.prune_duplicates else set()
 
-    # Filter candidates by include/exclude patterns and domain
-    filtered = [
-        u
-        for u in candidates
-        if url_allowed(u, domain, include_filters, exclude_filters)
-    ]
-    print(f"  After filtering: {len(filtered)} URLs")
+    def candidates():
+        # sitemap discovery, filtering and the incremental check all run
+        # lazily, so crawling starts with the first matching URL
+        for e in iter_sitemaps(session, root, cache, args.sitemap_workers):
+            counts["discovered"] += 1
+            # Filter candidates by include/exclude patterns and domain
+            if not matcher.allowed(e.loc):
+                continue
+            counts["filtered"] += 1
+            live.add(e.loc)
+            if e.loc in sink.done_urls:
+                continue  # finished before the interrupted run stopped
+            if e.loc in known_duplicates:
+                counts["pruned"] += 1
+                continue
+            if args.incremental and previous and not state.needs_fetch(e):
+                continue
+            counts["todo"] += 1
+            yield e
 
-    if args.max and len(filtered) > args.max:
-        filtered = filtered[: args.max]
-        print(f"  Applying max limit: {len(filtered)} URLs")
+    print("Reading sitemaps and crawling...")
+    discovery = candidates()
+    todo = itertools.islice(discovery, args.max) if args.max else discovery
 
-    out_records = []
-    seen_urls = set()
+    sink = RecordSink(ndjson_path, args.checkpoint_every, resume=args.resume)
+    if sink.pages:
+        print(f"  Resuming after {sink.pages} pages ({sink.records} records)")
 
-    for url in tqdm(filtered, desc="Crawling"):
-        if url in seen_urls:
-            continue
-        seen_urls.add(url)
-        html = fetch(session, url)
-        time.sleep(args.delay)
-        if not html:
-            continue
-        soup = BeautifulSoup(html, "lxml")
-        jsonld_nodes = parse_jsonld(soup, url)
-
-        # Prefer nodes with types we care about
-        picked = []
-        for n in jsonld_nodes:
-            t = n.get("@type")
-            types = {t} if isinstance(t, str) else set(t or [])
-            if types & PREFERRED_TYPES:
-                picked.append(n)
-
-        if (
-            not picked
-            and args.fallback
-            and any("/sehenswertes" in url or "/sightseeing" in url for _ in [0])
-        ):
-            # try heuristic attraction extraction
-            rec = extract_fallback_attraction(soup, url)
-            if rec.get("name"):
-                out_records.append(
-                    {
-                        "id": slug_from_url(url),
-                        "name": rec["name"],
-                        "category": "attraction",
-                        "url": url,
-                        "start_date": None,
-                        "end_date": None,
-                        "summary": rec["summary"],
-                        "address": rec["address"],
-                        "geo": rec["geo"],
-                        "opening_hours": rec["opening_hours"],
-                        "price": rec["price"],
-                        "tags": rec["tags"],
-                        "images": rec["images"],
-                        "source_url": url,
-                    }
-                )
-            continue
-
-        for n in picked:
-            cat = pick_category_from_type(n.get("@type"))
-            if cat == "event":
-                data = extract_event_from_jsonld(n)
-            else:
-                data = extract_attraction_from_jsonld(n)
-
-            out_records.append(
-                {
-                    "id": slug_from_url(data.get("url") or url),
-                    "name": data.get("name"),
-                    "category": cat,
-                    "url": data.get("url") or url,
-                    "start_date": data.get("start_date") if cat == "event" else None,
-                    "end_date": data.get("end_date") if cat == "event" else None,
-                    "summary": data.get("summary"),
-                    "address": data.get("address"),
-                    "geo": data.get("geo"),
-                    "opening_hours": data.get("opening_hours"),
-                    "price": data.get("price"),
-                    "tags": data.get("tags") or [],
-                    "images": data.get("images") or [],
-                    "source_url": url,
-                }
-            )
-
-    # Deduplicate by URL/id
-    by_key = {}
-
-    def score(r):
-        return (
-            (1 if r.get("geo") else 0)
-            + (1 if r.get("images") else 0)
-            + (1 if r.get("summary") else 0)
-            + (1 if r.get("start_date") else 0)
+    fetched = asyncio.run(
+        crawl(
+            args,
+            session,
+            todo,
+            limiter,
+            cache,
+            state,
+            previous,
+            sink,
+            matcher,
+            metrics,
+            archive,
         )
+    )
+    if args.incremental and previous:
+        # finish discovery so pages beyond --max are not treated as removed
+        for _ in discovery:
+            pass
+    discovery.close()
+    if cache:
+        cache.close()
+    if archive:
+        archive.close()
+    state.close()
+
+    print(f"  Sitemap URLs discovered: {counts['discovered']}")
+    print(f"  After filtering: {counts['filtered']} URLs")
+    if args.incremental and previous:
+        print(f"  Incremental: {counts['todo']} new or changed URLs")
+    if counts["pruned"]:
+        print(f"  Known duplicates skipped: {counts['pruned']} URLs")
+    if args.max:
+        print(f"  Max limit: {args.max} URLs")
 
-    for r in out_records:
-        k = r.get("id") or r.get("url")
-        prev = by_key.get(k)
-        if not prev or score(r) >= score(prev):
-            by_key[k] = r
+    if args.incremental and previous:
+        # keep earlier records for pages still in the sitemap but not re-fetched
+        # (in this run or, with --resume, before the interruption)
+        for url, records in previous.items():
+            if url in live and url not in fetched and url not in sink.done_urls:
+                sink.write_records(records)
+    sink.close()
 
-    final = list(by_key.values())
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(final, f, ensure_ascii=False, indent=2)
+    n = write_output(args, ndjson_path, metrics)
+    if stop_stats:
+        stop_stats()
 
-    print(f"Wrote {len(final)} records → {args.out}")
+    print(f"Wrote {n} records → {args.out}")
 
 
 if __name__ == "__main__":